@@ -2,10 +2,26 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from datetime import timedelta, datetime
+from bisect import bisect_left
+from collections import Counter, OrderedDict, deque
+from itertools import islice
+import asyncio
+import csv
+import gzip
+import io
 import json
 import os
-from typing import Optional
+import re
+import secrets
+import tempfile
+import time
+from typing import Literal, Optional
 from keep_alive import keep_alive
+from migration import apply_warn_migration
+from storage import create_storage
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential
+from tracing import start_loop_monitor, tracer
+from triage import SEVERITIES, create_triage_queue
 
 # Bot Setup
 intents = discord.Intents.default()
@@ -13,34 +29,549 @@ intents.message_content = True
 intents.members = True
 intents.guilds = True
 
+# Statistik
+STATS_VERSION = 2           # Ältere stats.json werden beim Laden neu aufgebaut
+STATS_REPORT_BUCKET = "reports"   # Reports stammen von Membern, nicht von Moderatoren
+
+# Anti-Raid Standardwerte (pro Server über /antiraid überschreibbar)
+RAID_DEFAULTS = {
+    "aktiv": False,
+    "joins": 10,
+    "sekunden": 10,
+    "min_alter_tage": 7,
+    "aktion": "timeout",
+    "timeout_minuten": 60,
+    "lockdown": True
+}
+RAID_DURATION = 600       # Sekunden, in denen nach einem Raid neue Joins direkt geprüft werden
+RAID_NAME_WINDOW = 300    # Zeitfenster für Namens-Cluster und markierte Member
+RAID_MAX_NAMES = 500      # Obergrenze für gemerkte Namen pro Server
+RAID_MAX_FLAGGED = 200    # Obergrenze für markierte Member pro Server
+RAID_MAX_PENDING = 1000   # Obergrenze für noch nicht bearbeitete Member pro Server
+RAID_BATCH_DELAY = 2      # Sekunden, in denen Joins zu einem Batch gesammelt werden
+RAID_BATCH_SIZE = 50
+
+class RaidDetector:
+    """Hält den Join-Zustand eines Servers, alle Strukturen sind in der Größe begrenzt"""
+
+    def __init__(self):
+        self.joins = deque(maxlen=RAID_DEFAULTS["joins"])
+        self.names = deque()
+        self.name_counts = Counter()
+        self.flagged = deque(maxlen=RAID_MAX_FLAGGED)
+        self.pending = deque(maxlen=RAID_MAX_PENDING)
+        self.raid_until = 0.0
+        self.raid_id = None
+        self.locked_channels = []
+        self.flush_task = None
+
+    def record_join(self, now: float, threshold: int, window: int) -> bool:
+        """Sliding Window: True, wenn die letzten `threshold` Joins innerhalb von `window` Sekunden lagen"""
+        if self.joins.maxlen != threshold:
+            self.joins = deque(self.joins, maxlen=threshold)
+        self.joins.append(now)
+        return len(self.joins) == threshold and now - self.joins[0] <= window
+
+    def name_cluster(self, key: Optional[str], now: float) -> int:
+        """Zählt, wie viele ähnliche Namen im Zeitfenster beigetreten sind"""
+        while self.names and (now - self.names[0][0] > RAID_NAME_WINDOW or len(self.names) >= RAID_MAX_NAMES):
+            _, old_key = self.names.popleft()
+            self.name_counts[old_key] -= 1
+            if self.name_counts[old_key] <= 0:
+                del self.name_counts[old_key]
+        if not key:
+            return 0
+        self.names.append((now, key))
+        self.name_counts[key] += 1
+        return self.name_counts[key]
+
+    def is_raid(self, now: float) -> bool:
+        return now < self.raid_until
+
+def raid_name_key(name: str) -> Optional[str]:
+    """Normalisiert einen Namen für die Cluster-Erkennung (raider123 / Raider_456 -> raider)"""
+    key = re.sub(r"[^a-z]", "", name.lower())[:8]
+    return key if len(key) >= 3 else None
+
+class LRUDict(OrderedDict):
+    """Dict mit fester Maximalgröße, der am längsten unbenutzte Eintrag fliegt zuerst raus"""
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+# Report Limits
+REPORT_BUCKET_SIZE = 3          # Reports, die ein User direkt hintereinander senden darf
+REPORT_REFILL_SECONDS = 120     # Sekunden, bis ein weiterer Report möglich ist
+REPORT_COALESCE_WINDOW = 1800   # Reports zum selben User werden so lange zusammengefasst
+REPORT_MAX_TRACKED = 1000       # Obergrenze für Reporter und gemeldete User pro Server
+REPORT_MAX_REASONS = 10         # Gespeicherte Gründe pro Report-Case
+
+class ReportLimiter:
+    """Token Bucket pro Reporter und offene Reports pro gemeldetem User (O(1), begrenzt)"""
+
+    def __init__(self):
+        self.buckets = LRUDict(REPORT_MAX_TRACKED)
+        self.open_reports = LRUDict(REPORT_MAX_TRACKED)
+
+    def allow(self, reporter_id: int, now: float) -> bool:
+        """Verbraucht einen Token, falls vorhanden"""
+        tokens, last = self.buckets.get(reporter_id, (REPORT_BUCKET_SIZE, now))
+        tokens = min(REPORT_BUCKET_SIZE, tokens + (now - last) / REPORT_REFILL_SECONDS)
+        if tokens < 1:
+            self.buckets[reporter_id] = (tokens, now)
+            return False
+        self.buckets[reporter_id] = (tokens - 1, now)
+        return True
+
+    def refund(self, reporter_id: int):
+        """Gibt einen Token zurück, wenn der Report nicht zugestellt werden konnte"""
+        if reporter_id in self.buckets:
+            tokens, last = self.buckets[reporter_id]
+            self.buckets[reporter_id] = (min(REPORT_BUCKET_SIZE, tokens + 1), last)
+
+    def retry_after(self, reporter_id: int, now: float) -> int:
+        tokens, last = self.buckets.get(reporter_id, (REPORT_BUCKET_SIZE, now))
+        return max(1, int((1 - tokens) * REPORT_REFILL_SECONDS - (now - last)))
+
+    def get_open(self, user_id: int, now: float) -> Optional[dict]:
+        """Offener Report zu einem User innerhalb des Zeitfensters"""
+        report = self.open_reports.get(user_id)
+        if report and now - report["opened"] > REPORT_COALESCE_WINDOW:
+            del self.open_reports[user_id]
+            return None
+        return report
+
+    def open(self, user_id: int, case_id: int, message_id: int, reporter_id: int, now: float):
+        self.open_reports[user_id] = {
+            "case_id": case_id,
+            "message_id": message_id,
+            "reporters": {reporter_id},
+            "opened": now
+        }
+
+# DM Versand
+DM_QUEUE_SIZE = 1000           # Maximal wartende Empfänger
+DM_WORKERS = 3
+DM_MAX_ATTEMPTS = 5
+DM_MAX_EMBEDS = 10             # Discord Limit pro Nachricht
+DM_BREAKER_THRESHOLD = 5       # 429er in Folge beim Erstellen von DM-Channels
+DM_BREAKER_COOLDOWN = 60       # Sekunden Pause, wenn der Circuit Breaker offen ist
+DM_SAVE_DELAY = 5              # Sekunden, im JSON Modus wird der Zustellstatus gesammelt gespeichert
+
+def is_retryable_dm_error(error: BaseException) -> bool:
+    """Nur Rate Limits und Serverfehler werden wiederholt"""
+    return isinstance(error, discord.HTTPException) and (error.status == 429 or error.status >= 500)
+
+class DMDispatcher:
+    """Verschickt DMs im Hintergrund: begrenzte Queue, eine Nachricht pro User, Retry mit Backoff, Circuit Breaker"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.queue = None
+        self.pending = {}
+        self.failures = 0
+        self.open_until = 0.0
+        self.workers = []
+        self.save_handle = None
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=DM_QUEUE_SIZE)
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(DM_WORKERS)]
+
+    def send(self, user: discord.abc.User, embed: discord.Embed, guild_id: str, case_id: int) -> bool:
+        """Reiht eine DM ein, blockiert nie. Mehrere DMs an denselben User werden zusammengefasst"""
+        job = self.pending.get(user.id)
+        if job and len(job["embeds"]) < DM_MAX_EMBEDS:
+            if (guild_id, case_id) not in job["cases"]:
+                job["embeds"].append(embed)
+                job["cases"].append((guild_id, case_id))
+            return True
+
+        if job or self.queue is None:
+            self.bot.spawn(self.record_status([(guild_id, case_id)], "verworfen"))
+            return False
+
+        try:
+            self.queue.put_nowait(user.id)
+        except asyncio.QueueFull:
+            self.bot.spawn(self.record_status([(guild_id, case_id)], "verworfen"))
+            return False
+        self.pending[user.id] = {"user": user, "embeds": [embed], "cases": [(guild_id, case_id)]}
+        return True
+
+    async def worker(self):
+        while True:
+            user_id = await self.queue.get()
+            job = self.pending.pop(user_id, None)
+            if not job:
+                continue
+            try:
+                status = await self.deliver(job)
+            except Exception as e:
+                print(f"⚠️ DM an {user_id} fehlgeschlagen: {e}")
+                status = "fehlgeschlagen"
+            try:
+                await self.record_status(job["cases"], status)
+            except Exception as e:
+                # Ein Speicherfehler darf den Worker nicht beenden
+                print(f"⚠️ DM Status für {user_id} nicht gespeichert: {e!r}")
+
+    async def deliver(self, job: dict) -> str:
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(DM_MAX_ATTEMPTS),
+                wait=wait_exponential(multiplier=1, min=1, max=60),
+                retry=retry_if_exception(is_retryable_dm_error),
+                reraise=True
+            ):
+                with attempt:
+                    await self.wait_for_breaker()
+                    try:
+                        channel = job["user"].dm_channel or await job["user"].create_dm()
+                    except discord.HTTPException as e:
+                        if e.status == 429:
+                            self.failures += 1
+                            if self.failures >= DM_BREAKER_THRESHOLD:
+                                self.open_until = time.monotonic() + DM_BREAKER_COOLDOWN
+                        raise
+                    self.failures = 0
+                    await channel.send(embeds=job["embeds"])
+        except discord.Forbidden:
+            return "blockiert"
+        except discord.HTTPException:
+            return "fehlgeschlagen"
+        return "zugestellt"
+
+    async def wait_for_breaker(self):
+        """Wartet, solange das Erstellen von DM-Channels gedrosselt wird"""
+        remaining = self.open_until - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    async def record_status(self, cases: list, status: str):
+        """Speichert den Zustellstatus an den Cases"""
+        for guild_id, case_id in cases:
+            case = await self.bot.get_case(guild_id, case_id)
+            if case:
+                case["dm_status"] = status
+                if self.bot.db:
+                    await self.bot.update_case(guild_id, case, "dm_status")
+        if not self.bot.db:
+            self.schedule_save()
+
+    def schedule_save(self):
+        """Ein save_data für alle Status im Zeitfenster statt einem pro DM"""
+        if self.save_handle is None:
+            self.save_handle = asyncio.get_running_loop().call_later(DM_SAVE_DELAY, self.flush_status)
+
+    def flush_status(self):
+        self.save_handle = None
+        self.bot.save_data()
+
+# Audit-Log Import
+AUDIT_INGEST = os.getenv("AUDIT_INGEST", "1") == "1"   # Bei mehreren Instanzen nur auf einer aktivieren
+AUDIT_INTERVAL = 300       # Sekunden zwischen zwei Durchläufen
+AUDIT_CATCHUP_INTERVAL = 30   # Sekunden bis zum nächsten Durchlauf, wenn ein Server noch im Rückstand ist
+AUDIT_PAGE_SIZE = 100      # Einträge pro Request (Discord Maximum)
+AUDIT_MAX_PAGES = 20       # Requests pro Server und Durchlauf
+AUDIT_GUILD_DELAY = 1      # Sekunden Pause zwischen Servern
+AUDIT_MAX_DELAY = 60
+AUDIT_ACTIONS = {
+    discord.AuditLogAction.ban: "ban",
+    discord.AuditLogAction.unban: "unban",
+    discord.AuditLogAction.kick: "kick"
+}
+
+# Geteilte Banlisten
+BAN_PROPAGATION_WORKERS = 3    # Parallele Bans in anderen Servern
+BAN_PROPAGATION_DELAY = 0.5    # Sekunden Pause pro Worker nach jedem Ban
+BAN_PROPAGATION_RETRIES = 3
+BAN_INVITE_TTL = 86400         # Sekunden, so lange gilt eine Einladung in eine Ban-Gruppe
+
+class SharedBanList:
+    """Hash-Set der gebannten User IDs einer Gruppe, Prüfung beim Join in O(1)"""
+
+    def __init__(self):
+        self.ids = set()
+
+    def add(self, user_id: int):
+        self.ids.add(user_id)
+
+    def discard(self, user_id: int):
+        self.ids.discard(user_id)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+class BanPropagator:
+    """Überträgt Bans an die anderen Server einer Gruppe mit begrenzter Parallelität"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.queue = None
+        self.workers = []
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(BAN_PROPAGATION_WORKERS)]
+
+    def propagate(self, source: discord.Guild, user: discord.abc.User, reason: str, group: str) -> int:
+        """Reiht Bans für alle anderen Server der Gruppe ein, gibt die Anzahl zurück"""
+        targets = [guild for guild in self.bot.group_guilds(group) if guild.id != source.id]
+        for guild in targets:
+            self.queue.put_nowait((guild, user, reason, group, source))
+        return len(targets)
+
+    async def worker(self):
+        while True:
+            guild, user, reason, group, source = await self.queue.get()
+            for attempt in range(BAN_PROPAGATION_RETRIES):
+                try:
+                    await guild.ban(user, reason=f"Geteilte Banliste von {source.name}: {reason}", delete_message_days=0)
+                    await self.bot.add_case(
+                        str(guild.id),
+                        "ban",
+                        user.id,
+                        self.bot.user.id,
+                        reason,
+                        {"quelle": "ban_gruppe", "ban_gruppe": group, "ursprung": source.id}
+                    )
+                    break
+                except discord.Forbidden:
+                    break
+                except discord.HTTPException as e:
+                    if e.status != 429 and e.status < 500:
+                        break
+                    await asyncio.sleep(2 ** (attempt + 1))
+                except Exception as e:
+                    print(f"⚠️ Ban-Übertragung an {guild.id} fehlgeschlagen: {e}")
+                    break
+            await asyncio.sleep(BAN_PROPAGATION_DELAY)
+
+# Autocomplete
+AUTOCOMPLETE_RECENT = 25          # Letzte Cases pro Server
+AUTOCOMPLETE_USER_CASES = 10      # Letzte Cases pro User
+AUTOCOMPLETE_MAX_USERS = 5000     # User mit gemerkten Cases pro Server
+AUTOCOMPLETE_MAX_REASONS = 500    # Gemerkte Gründe pro Server
+AUTOCOMPLETE_REASON_TYPES = ("ban", "kick", "timeout", "warn", "lock")
+
+class AutocompleteIndex:
+    """Vorberechnete Daten eines Servers für Autocomplete, ohne Storage oder REST Calls"""
+
+    def __init__(self, bot_id: Optional[int]):
+        self.bot_id = bot_id
+        self.recent = deque(maxlen=AUTOCOMPLETE_RECENT)
+        self.user_cases = LRUDict(AUTOCOMPLETE_MAX_USERS)
+        self.reasons = Counter()
+
+    def add(self, case: dict):
+        self.recent.appendleft(case)
+        if case["user_id"]:
+            cases = self.user_cases.get(case["user_id"])
+            if cases is None:
+                cases = self.user_cases[case["user_id"]] = deque(maxlen=AUTOCOMPLETE_USER_CASES)
+            cases.appendleft(case)
+
+        # Nur von Moderatoren getippte Gründe, keine Report-Texte, Systemtexte oder übernommene Cases
+        reason = case["reason"]
+        if (reason and len(reason) <= 100 and case["type"] in AUTOCOMPLETE_REASON_TYPES
+                and case["moderator_id"] != self.bot_id and "quelle" not in case):
+            self.reasons[reason] += 1
+            if len(self.reasons) > AUTOCOMPLETE_MAX_REASONS:
+                # Seltene Gründe vergessen, die häufigen bleiben
+                self.reasons = Counter(dict(self.reasons.most_common(AUTOCOMPLETE_MAX_REASONS // 2)))
+
+class TracedCommandTree(app_commands.CommandTree):
+    """Misst jeden Slash Command und jedes Autocomplete als eigenen Trace"""
+
+    async def _call(self, interaction: discord.Interaction):
+        if not tracer.enabled:
+            return await super()._call(interaction)
+        kind = "autocomplete" if interaction.type == discord.InteractionType.autocomplete else "command"
+        with tracer.trace(f"{kind}:{(interaction.data or {}).get('name', '?')}"):
+            return await super()._call(interaction)
+
+def trace_http(http):
+    """Misst alle REST Calls an Discord"""
+    original = http.request
+
+    async def request(route, **kwargs):
+        with tracer.span("rest", route=f"{route.method} {route.path}"):
+            return await original(route, **kwargs)
+
+    http.request = request
+
 class ModBot(commands.Bot):
     def __init__(self):
-        super().__init__(command_prefix="!", intents=intents)
+        super().__init__(command_prefix="!", intents=intents, tree_cls=TracedCommandTree)
+        if tracer.enabled:
+            trace_http(self.http)
         self.cases = {}
-        self.warns = {}
+        self.active_warns = {}
         self.config = {}
+        self.stats = {}
+        self.raid_detectors = {}
+        self.report_limiters = {}
+        self.triage = None
+        self.dms = DMDispatcher(self)
+        self.shared_bans = {}
+        self.ban_propagator = BanPropagator(self)
+        self.autocomplete = {}
+        self.command_names = []
+        self.audit_task = None
+        self.audit_cursors = {}
+        self.background_tasks = set()
+        self.db = create_storage()
         self.load_data()
 
+    def spawn(self, coro) -> asyncio.Task:
+        """Startet einen Hintergrund-Task und hält ihn fest, der Loop kennt Tasks nur per Weak Reference"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
     def load_data(self):
-        """Lädt Cases, Warns und Config aus JSON"""
+        """Lädt Cases und Config aus der Datenbank oder aus JSON"""
+        if self.db:
+            if self.db.is_empty():
+                # Erster Start mit Datenbank: bestehende JSON Dateien übernehmen
+                self.load_json()
+                self.db.import_json(self.cases, self.config)
+                print("✅ JSON Daten in die Datenbank importiert")
+            self.cases, self.config = self.db.load()
+            self.rebuild_stats()
+            return
+        self.load_json()
+        stats = None
+        if os.path.exists('stats.json'):
+            with open('stats.json', 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+        if stats and stats.get("version") == STATS_VERSION:
+            self.stats = stats["guilds"]
+        else:
+            self.rebuild_stats()
+
+    def load_json(self):
+        """Lädt Cases und Config aus JSON"""
         if os.path.exists('cases.json'):
             with open('cases.json', 'r', encoding='utf-8') as f:
                 self.cases = json.load(f)
         if os.path.exists('warns.json'):
-            with open('warns.json', 'r', encoding='utf-8') as f:
-                self.warns = json.load(f)
+            self.migrate_warns()
         if os.path.exists('config.json'):
             with open('config.json', 'r', encoding='utf-8') as f:
                 self.config = json.load(f)
+        if os.path.exists('audit_cursors.json'):
+            with open('audit_cursors.json', 'r', encoding='utf-8') as f:
+                self.audit_cursors = json.load(f)
 
     def save_data(self):
-        """Speichert Cases, Warns und Config"""
+        """Speichert Cases, Config und Statistik"""
+        if self.db:
+            # Die Datenbank wird bei jeder Änderung direkt geschrieben
+            return
+        with tracer.span("storage.save_data"):
+            with open('cases.json', 'w', encoding='utf-8') as f:
+                json.dump(self.cases, f, indent=4, ensure_ascii=False)
+            with open('config.json', 'w', encoding='utf-8') as f:
+                json.dump(self.config, f, indent=4, ensure_ascii=False)
+            with open('stats.json', 'w', encoding='utf-8') as f:
+                json.dump({"version": STATS_VERSION, "guilds": self.stats}, f, ensure_ascii=False)
+            with open('audit_cursors.json', 'w', encoding='utf-8') as f:
+                json.dump(self.audit_cursors, f, ensure_ascii=False)
+
+    def index_case(self, guild_id: str, case: dict):
+        """Trägt einen neuen Case in alle In-Memory Indizes ein"""
+        self.count_case(guild_id, case)
+        if "ban_gruppe" in case:
+            self.apply_shared_ban(case)
+        self.get_autocomplete_index(guild_id).add(case)
+        self.index_warn(guild_id, case)
+
+    def rebuild_indexes(self):
+        """Baut geteilte Banlisten, Autocomplete-Indizes und aktive Warnungen aus den geladenen Cases auf"""
+        self.rebuild_shared_bans()
+        self.autocomplete = {}
+        self.active_warns = {}
+        for guild_id, cases in self.cases.items():
+            index = self.get_autocomplete_index(guild_id)
+            for case in cases:
+                index.add(case)
+                self.index_warn(guild_id, case)
+
+    def get_autocomplete_index(self, guild_id: str) -> "AutocompleteIndex":
+        index = self.autocomplete.get(guild_id)
+        if index is None:
+            index = self.autocomplete[guild_id] = AutocompleteIndex(self.user.id if self.user else None)
+        return index
+
+    def migrate_warns(self):
+        """Übernimmt die alte warns.json: aktiv ist eine Warnung nur noch über active am warn Case"""
+        with open('warns.json', 'r', encoding='utf-8') as f:
+            old_warns = json.load(f)
+
+        for guild_id, case_id in apply_warn_migration(self.cases, old_warns):
+            print(f"⚠️ Warnung #{case_id} auf {guild_id} hat keinen Case und wird verworfen")
+
         with open('cases.json', 'w', encoding='utf-8') as f:
             json.dump(self.cases, f, indent=4, ensure_ascii=False)
-        with open('warns.json', 'w', encoding='utf-8') as f:
-            json.dump(self.warns, f, indent=4, ensure_ascii=False)
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=4, ensure_ascii=False)
+        # Die Zähler für aktive Cases stimmen danach nicht mehr, stats.json wird neu aufgebaut
+        if os.path.exists('stats.json'):
+            os.remove('stats.json')
+        os.replace('warns.json', 'warns.json.bak')
+        print("✅ warns.json in die Cases übernommen (Backup: warns.json.bak)")
+
+    # ============= AKTIVE WARNUNGEN =============
+    def get_active_warns(self, guild_id: str, user_id: int) -> list:
+        """Aktive Warnungen eines Users, View über die warn Cases mit active=True"""
+        return list(self.active_warns.get(guild_id, {}).get(user_id, {}).values())
+
+    def index_warn(self, guild_id: str, case: dict):
+        if case["type"] == "warn" and case.get("active", True):
+            self.active_warns.setdefault(guild_id, {}).setdefault(case["user_id"], {})[case["case_id"]] = case
+
+    def unindex_warn(self, guild_id: str, case: dict):
+        user_warns = self.active_warns.get(guild_id, {}).get(case["user_id"])
+        if user_warns:
+            user_warns.pop(case["case_id"], None)
+            if not user_warns:
+                del self.active_warns[guild_id][case["user_id"]]
+
+    # ============= STATISTIK =============
+    def count_case(self, guild_id: str, case: dict, field: int = 0):
+        """Zählt einen Case im Bucket Server x Tag x Moderator x Typ (field 0 = gesamt, 1 = deaktiviert)"""
+        day = case["timestamp"][:10]
+        moderators = self.stats.setdefault(guild_id, {}).setdefault(day, {})
+        # Bei Reports steht der Reporter in moderator_id, sie bekommen einen eigenen Bucket
+        moderator = STATS_REPORT_BUCKET if case["type"] == "report" else str(case["moderator_id"])
+        bucket = moderators.setdefault(moderator, {}).setdefault(case["type"], [0, 0])
+        bucket[field] += 1
+
+    def rebuild_stats(self):
+        """Baut die Statistik in einem Durchlauf aus allen Cases neu auf"""
+        self.stats = {}
+        for guild_id, cases in self.cases.items():
+            for case in cases:
+                self.count_case(guild_id, case)
+                if not case.get("active", True):
+                    self.count_case(guild_id, case, 1)
 
     def get_next_case_id(self, guild_id: str) -> int:
         """Generiert die nächste Case ID für einen Server"""
@@ -48,50 +579,183 @@ class ModBot(commands.Bot):
             self.cases[guild_id] = []
         return len(self.cases[guild_id]) + 1
 
-    def add_case(self, guild_id: str, case_type: str, user_id: int, moderator_id: int, reason: str, extra_data: dict = None) -> int:
-        """Fügt einen neuen Case hinzu"""
-        case_id = self.get_next_case_id(guild_id)
+    def build_case(self, case_type: str, user_id: int, moderator_id: int, reason: str, extra_data: dict = None, timestamp: datetime = None) -> dict:
+        """Erstellt einen Case, die Case ID wird beim Speichern vergeben"""
         case = {
-            "case_id": case_id,
+            "case_id": None,
             "type": case_type,
             "user_id": user_id,
             "moderator_id": moderator_id,
             "reason": reason,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": (timestamp or datetime.utcnow()).isoformat(),
             "active": True
         }
         if extra_data:
             case.update(extra_data)
+        return case
 
-        if guild_id not in self.cases:
-            self.cases[guild_id] = []
+    async def add_case(self, guild_id: str, case_type: str, user_id: int, moderator_id: int, reason: str, extra_data: dict = None, save: bool = True) -> int:
+        """Fügt einen neuen Case hinzu (save=False für Batches, danach einmal save_data aufrufen)"""
+        case = self.build_case(case_type, user_id, moderator_id, reason, extra_data)
+
+        if self.db:
+            # Die Case ID wird atomar in der Datenbank vergeben
+            case_id = await self.db.add_case(guild_id, case)
+            self.cache_case(guild_id, case)
+            return case_id
+
+        case_id = self.get_next_case_id(guild_id)
+        case["case_id"] = case_id
         self.cases[guild_id].append(case)
-        self.save_data()
+        self.index_case(guild_id, case)
+        if save:
+            self.save_data()
         return case_id
 
+    async def add_cases(self, guild_id: str, cases: list, save: bool = True, audit_cursor: Optional[int] = None) -> list:
+        """Speichert mehrere Cases (aus build_case) mit einem einzigen Schreibvorgang, optional mit dem Audit-Log Cursor"""
+        if not cases and audit_cursor is None:
+            return []
+
+        if self.db:
+            case_ids = await self.db.add_cases(guild_id, cases, audit_cursor)
+            for case in cases:
+                self.cache_case(guild_id, case)
+        else:
+            case_ids = []
+            for case in cases:
+                case["case_id"] = self.get_next_case_id(guild_id)
+                self.cases[guild_id].append(case)
+                self.index_case(guild_id, case)
+                case_ids.append(case["case_id"])
+
+        if audit_cursor is not None:
+            self.audit_cursors[guild_id] = audit_cursor
+        if save:
+            self.save_data()
+        return case_ids
+
+    def cache_case(self, guild_id: str, case: dict):
+        """Fügt einen Case in den lokalen Cache ein oder ersetzt ihn"""
+        cases = self.cases.setdefault(guild_id, [])
+        cached = self.get_cached_case(guild_id, case["case_id"])
+        if cached is not None:
+            if cached.get("active", True) and not case.get("active", True):
+                self.count_case(guild_id, case, 1)
+                self.unindex_warn(guild_id, cached)
+            cached.clear()
+            cached.update(case)
+            return
+        cases.append(case)
+        self.index_case(guild_id, case)
+        # Cases anderer Instanzen können verspätet ankommen
+        if len(cases) > 1 and cases[-2]["case_id"] > case["case_id"]:
+            cases.sort(key=lambda c: c["case_id"])
+
+    async def update_case(self, guild_id: str, case: dict, *fields: str):
+        """Speichert Änderungen an einem bestehenden Case, fields sind die geänderten Keys"""
+        if self.db:
+            await self.db.update_case(guild_id, case, fields)
+        else:
+            self.save_data()
+
+    async def deactivate_case(self, guild_id: str, case: dict, *fields: str):
+        """Markiert einen Case als inaktiv und zählt das in der Statistik (fields: weitere geänderte Keys)"""
+        if not case.get("active", True):
+            return
+        case["active"] = False
+        self.count_case(guild_id, case, 1)
+        self.unindex_warn(guild_id, case)
+        await self.update_case(guild_id, case, "active", *fields)
+
+    async def save_config(self, guild_id: str):
+        """Speichert die Config eines Servers, andere Instanzen laden sie neu"""
+        if self.db:
+            await self.db.save_config(guild_id, self.config.get(guild_id, {}))
+        else:
+            self.save_data()
+
+    def on_storage_event(self, payload: dict):
+        """Änderung einer anderen Instanz (LISTEN/NOTIFY)"""
+        self.spawn(self.refresh_from_storage(payload))
+
+    async def refresh_from_storage(self, payload: dict):
+        kind = payload["kind"]
+        if kind == "reconnect":
+            self.cases, self.config = await self.db.run(self.db.load)
+            self.rebuild_stats()
+            self.rebuild_indexes()
+            return
+
+        guild_id = payload["guild_id"]
+        if kind == "config":
+            self.config[guild_id] = await self.db.get_config(guild_id) or {}
+        elif kind == "case":
+            case = await self.db.get_case(guild_id, payload["case_id"])
+            if case:
+                self.cache_case(guild_id, case)
+
     async def log_action(self, interaction: discord.Interaction, embed: discord.Embed):
         """Sendet ein Embed in den Log-Kanal, falls konfiguriert"""
-        guild_id = str(interaction.guild.id)
+        await self.log_guild(interaction.guild, embed)
+
+    async def log_guild(self, guild: discord.Guild, embed: discord.Embed):
+        """Sendet ein Embed in den Log-Kanal eines Servers (auch ohne Interaction)"""
+        guild_id = str(guild.id)
         if guild_id in self.config and "log_channel" in self.config[guild_id]:
             channel_id = self.config[guild_id]["log_channel"]
-            channel = interaction.guild.get_channel(channel_id)
+            channel = guild.get_channel(channel_id)
             if channel:
                 try:
-                    await channel.send(embed=embed)
+                    with tracer.span("log"):
+                        await channel.send(embed=embed)
                 except:
                     pass
 
-    def get_case(self, guild_id: str, case_id: int):
+    async def get_case(self, guild_id: str, case_id: int):
         """Holt einen Case anhand der ID"""
+        case = self.get_cached_case(guild_id, case_id)
+        if case is None and self.db:
+            case = await self.db.get_case(guild_id, case_id)
+            if case:
+                self.cache_case(guild_id, case)
+        return case
+
+    def iter_cases(self, guild_id: str, user_id: Optional[int] = None, case_type: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None):
+        """Generator über alle passenden Cases, ohne eine Liste aufzubauen (start/end als ISO Zeitstempel)"""
+        if self.db:
+            yield from self.db.iter_cases(guild_id, user_id, case_type, start, end)
+            return
+        for case in self.cases.get(guild_id, []):
+            if user_id is not None and case["user_id"] != user_id:
+                continue
+            if case_type and case["type"] != case_type:
+                continue
+            if start and case["timestamp"] < start:
+                continue
+            if end and case["timestamp"] >= end:
+                continue
+            yield case
+
+    def get_cached_case(self, guild_id: str, case_id: int):
+        """Holt einen Case aus dem lokalen Speicher"""
         if guild_id not in self.cases:
             return None
-        for case in self.cases[guild_id]:
+        # Case IDs sind fortlaufend, daher zuerst direkt per Index
+        cases = self.cases[guild_id]
+        if 0 < case_id <= len(cases) and cases[case_id - 1]["case_id"] == case_id:
+            return cases[case_id - 1]
+        for case in cases:
             if case["case_id"] == case_id:
                 return case
         return None
 
     def has_mod_permission(self, member: discord.Member, command: str) -> bool:
         """Prüft ob ein Member die Berechtigung für einen Command hat"""
+        with tracer.span("permission", command=command):
+            return self._has_mod_permission(member, command)
+
+    def _has_mod_permission(self, member: discord.Member, command: str) -> bool:
         guild_id = str(member.guild.id)
         if guild_id not in self.config:
             return member.guild_permissions.administrator
@@ -109,6 +773,21 @@ class ModBot(commands.Bot):
         return member.guild_permissions.administrator
 
     async def setup_hook(self):
+        # Erst nach dem Login, die Autocomplete-Indizes brauchen die ID des Bots
+        self.rebuild_indexes()
+        start_loop_monitor()
+        self.dms.start()
+        self.ban_propagator.start()
+        if self.db:
+            await self.db.start_listener(self.on_storage_event)
+        if AUDIT_INGEST:
+            self.audit_task = asyncio.create_task(self.audit_ingest_loop())
+        self.triage = create_triage_queue()
+        if self.triage:
+            self.triage.start()
+            print("✅ Report-Triage aktiv")
+        # Prefix-Index der Command-Namen für /setpermission
+        self.command_names = sorted(command.qualified_name for command in self.tree.walk_commands())
         await self.tree.sync()
         print("✅ Slash Commands synchronisiert!")
 
@@ -117,6 +796,334 @@ class ModBot(commands.Bot):
         print(f"🔧 Custom Moderation Bot bereit")
         print(f"📊 Auf {len(self.guilds)} Servern aktiv")
 
+    # ============= AUDIT LOG IMPORT =============
+    async def audit_ingest_loop(self):
+        """Übernimmt regelmäßig neue Audit-Log Einträge aller Server als Cases"""
+        await self.wait_until_ready()
+        while True:
+            try:
+                await self.load_audit_cursors()
+                break
+            except Exception as e:
+                print(f"⚠️ Audit-Log Cursor konnten nicht geladen werden: {e!r}, neuer Versuch in {AUDIT_MAX_DELAY}s")
+                await asyncio.sleep(AUDIT_MAX_DELAY)
+        delay = AUDIT_GUILD_DELAY
+        while not self.is_closed():
+            cursors = dict(self.audit_cursors)
+            behind = False
+            for guild in list(self.guilds):
+                try:
+                    behind |= await self.ingest_audit_log(guild)
+                    delay = max(AUDIT_GUILD_DELAY, delay / 2)
+                except discord.Forbidden:
+                    pass
+                except discord.HTTPException as e:
+                    # Bei Rate Limits oder Serverfehlern selbst langsamer werden
+                    delay = min(AUDIT_MAX_DELAY, delay * 2)
+                    print(f"⚠️ Audit-Log von {guild.id} fehlgeschlagen ({e.status}), Pause {delay}s")
+                except Exception as e:
+                    # z.B. Datenbankfehler, der Import darf dadurch nicht dauerhaft stehen bleiben
+                    delay = min(AUDIT_MAX_DELAY, delay * 2)
+                    print(f"⚠️ Audit-Log Import für {guild.id} fehlgeschlagen: {e!r}, Pause {delay}s")
+                await asyncio.sleep(delay)
+            # JSON Modus: ein Schreibvorgang pro Durchlauf für alle Server
+            if not self.db and self.audit_cursors != cursors:
+                self.save_data()
+            await asyncio.sleep(AUDIT_CATCHUP_INTERVAL if behind else AUDIT_INTERVAL)
+
+    async def load_audit_cursors(self):
+        """Lädt die Cursor aus der Datenbank und übernimmt alte Cursor aus der Server-Config"""
+        if self.db:
+            self.audit_cursors = await self.db.load_audit_cursors()
+        for guild_id, guild_config in list(self.config.items()):
+            if "audit_cursor" in guild_config:
+                cursor = guild_config.pop("audit_cursor")
+                if guild_id not in self.audit_cursors:
+                    await self.add_cases(guild_id, [], save=False, audit_cursor=cursor)
+                await self.save_config(guild_id)
+
+    async def ingest_audit_log(self, guild: discord.Guild) -> bool:
+        """Liest Einträge nach dem Cursor seitenweise und speichert sie gesammelt, True bei Rückstand"""
+        if guild.me is None or not guild.me.guild_permissions.view_audit_log:
+            return False
+
+        guild_id = str(guild.id)
+        cursor = self.audit_cursors.get(guild_id)
+
+        if cursor is None:
+            # Erster Lauf: keine Historie nachladen, nur Einträge ab jetzt übernehmen
+            cursor = discord.utils.time_snowflake(discord.utils.utcnow())
+            async for entry in guild.audit_logs(limit=1):
+                cursor = entry.id
+            await self.add_cases(guild_id, [], save=False, audit_cursor=cursor)
+            return False
+
+        # Ungefiltert, damit ein einziger Cursor reicht. discord.py holt die Seiten selbst nacheinander
+        limit = AUDIT_PAGE_SIZE * AUDIT_MAX_PAGES
+        cases = []
+        seen = 0
+        last_id = cursor
+        async for entry in guild.audit_logs(limit=limit, after=discord.Object(id=cursor), oldest_first=True):
+            seen += 1
+            last_id = max(last_id, entry.id)
+            if entry.user_id in (None, self.user.id) or entry.target is None:
+                continue
+            case = self.audit_entry_to_case(entry)
+            if case:
+                cases.append(case)
+
+        if last_id == cursor:
+            return False
+
+        await self.add_cases(guild_id, cases, save=False, audit_cursor=last_id)
+        return seen == limit
+
+    def audit_entry_to_case(self, entry: discord.AuditLogEntry) -> Optional[dict]:
+        """Wandelt Ban, Unban, Kick und Timeout Einträge in Cases um"""
+        case_type = AUDIT_ACTIONS.get(entry.action)
+        extra = {"quelle": "audit_log", "audit_log_id": entry.id}
+
+        if entry.action == discord.AuditLogAction.member_update:
+            if not hasattr(entry.after, "timed_out_until"):
+                return None
+            timed_out_until = entry.after.timed_out_until
+            if timed_out_until:
+                case_type = "timeout"
+                extra["dauer"] = max(1, round((timed_out_until - entry.created_at).total_seconds() / 60))
+            else:
+                case_type = "untimeout"
+
+        if case_type is None:
+            return None
+
+        return self.build_case(
+            case_type,
+            entry.target.id,
+            entry.user_id,
+            entry.reason or "Kein Grund angegeben",
+            extra,
+            timestamp=entry.created_at.replace(tzinfo=None)
+        )
+
+    # ============= GETEILTE BANLISTE =============
+    def apply_shared_ban(self, case: dict):
+        """Aktualisiert die geteilte Banliste einer Gruppe anhand eines Ban/Unban Cases"""
+        group = case["ban_gruppe"]
+        if case["type"] == "ban":
+            if group not in self.shared_bans:
+                self.shared_bans[group] = SharedBanList()
+            self.shared_bans[group].add(case["user_id"])
+        elif case["type"] == "unban" and group in self.shared_bans:
+            self.shared_bans[group].discard(case["user_id"])
+
+    def rebuild_shared_bans(self):
+        """Baut die geteilten Banlisten aus der Case-Historie auf (zeitlich sortiert über alle Server)"""
+        self.shared_bans = {}
+        group_cases = [case for cases in self.cases.values() for case in cases if "ban_gruppe" in case]
+        group_cases.sort(key=lambda c: c["timestamp"])
+        for case in group_cases:
+            self.apply_shared_ban(case)
+
+    def get_ban_group(self, guild_id: str) -> Optional[str]:
+        return self.config.get(guild_id, {}).get("ban_gruppe")
+
+    def group_guilds(self, group: str) -> list:
+        """Alle Server des Bots, die Mitglied einer Ban-Gruppe sind"""
+        return [guild for guild in self.guilds if self.get_ban_group(str(guild.id)) == group]
+
+    async def create_ban_invite(self, guild_id: str, target_id: int) -> str:
+        """Einmalige Einladung in die Gruppe des Servers, nur für den angegebenen Server gültig"""
+        now = time.time()
+        invites = self.config[guild_id].setdefault("ban_einladungen", {})
+        for token in [t for t, invite in invites.items() if invite["bis"] < now]:
+            del invites[token]
+        token = secrets.token_urlsafe(16)
+        invites[token] = {"server_id": target_id, "bis": now + BAN_INVITE_TTL}
+        await self.save_config(guild_id)
+        return token
+
+    async def redeem_ban_invite(self, guild_id: str, token: str) -> Optional[str]:
+        """Löst eine Einladung ein und gibt die ID des einladenden Servers zurück, None wenn ungültig"""
+        for inviter_id, inviter_config in self.config.items():
+            invite = inviter_config.get("ban_einladungen", {}).get(token)
+            if invite is None:
+                continue
+            group = inviter_config.get("ban_gruppe")
+            if invite["server_id"] != int(guild_id) or invite["bis"] < time.time() or not group:
+                return None
+            del inviter_config["ban_einladungen"][token]
+            await self.save_config(inviter_id)
+            self.config.setdefault(guild_id, {})["ban_gruppe"] = group
+            await self.save_config(guild_id)
+            return inviter_id
+        return None
+
+    async def check_shared_ban(self, member: discord.Member) -> bool:
+        """Bannt einen beitretenden User, falls er auf der geteilten Banliste steht"""
+        guild_id = str(member.guild.id)
+        group = self.get_ban_group(guild_id)
+        ban_list = self.shared_bans.get(group) if group else None
+        if ban_list is None or member.id not in ban_list:
+            return False
+
+        try:
+            await member.ban(reason="Geteilte Banliste")
+        except discord.HTTPException:
+            return False
+        await self.add_case(
+            guild_id,
+            "ban",
+            member.id,
+            self.user.id,
+            "Geteilte Banliste",
+            {"quelle": "ban_gruppe", "ban_gruppe": group}
+        )
+        return True
+
+    # ============= ANTI-RAID =============
+    def get_raid_config(self, guild_id: str) -> dict:
+        """Anti-Raid Einstellungen eines Servers inkl. Standardwerte"""
+        return {**RAID_DEFAULTS, **self.config.get(guild_id, {}).get("antiraid", {})}
+
+    async def on_member_join(self, member: discord.Member):
+        if await self.check_shared_ban(member):
+            return
+
+        guild_id = str(member.guild.id)
+        cfg = self.get_raid_config(guild_id)
+        if not cfg["aktiv"] or member.bot:
+            return
+
+        detector = self.raid_detectors.get(guild_id)
+        if detector is None:
+            detector = self.raid_detectors[guild_id] = RaidDetector()
+        now = time.monotonic()
+
+        # Günstige Heuristiken, keine REST Calls
+        flags = []
+        if discord.utils.utcnow() - member.created_at < timedelta(days=cfg["min_alter_tage"]):
+            flags.append("neuer Account")
+        if member.avatar is None:
+            flags.append("Standard-Avatar")
+        if detector.name_cluster(raid_name_key(member.name), now) >= 3:
+            flags.append("ähnlicher Name")
+
+        triggered = detector.record_join(now, cfg["joins"], cfg["sekunden"])
+
+        if detector.is_raid(now):
+            if flags:
+                detector.pending.append((member, flags))
+                self.schedule_raid_flush(member.guild, detector)
+            return
+
+        if flags:
+            detector.flagged.append((now, member, flags))
+
+        if triggered:
+            await self.start_raid(member.guild, detector, cfg, now)
+
+    async def start_raid(self, guild: discord.Guild, detector: RaidDetector, cfg: dict, now: float):
+        """Aktiviert den Raid-Modus: Lockdown und Batch-Aktion gegen markierte Member"""
+        detector.raid_until = now + RAID_DURATION
+        # Solange Channels aus einem früheren Raid gesperrt sind, gehört die neue Welle zum selben Raid
+        if not detector.locked_channels:
+            detector.raid_id = int(time.time())
+
+        while detector.flagged:
+            flagged_at, member, flags = detector.flagged.popleft()
+            if now - flagged_at <= RAID_NAME_WINDOW:
+                detector.pending.append((member, flags))
+
+        locked = []
+        if cfg["lockdown"]:
+            semaphore = asyncio.Semaphore(5)
+
+            async def lock_channel(channel):
+                async with semaphore:
+                    overwrites = channel.overwrites_for(guild.default_role)
+                    overwrites.send_messages = False
+                    try:
+                        await channel.set_permissions(guild.default_role, overwrite=overwrites, reason="Anti-Raid Lockdown")
+                        return channel
+                    except discord.HTTPException:
+                        return None
+
+            channels = [c for c in guild.text_channels if c.permissions_for(guild.default_role).send_messages]
+            locked = [c for c in await asyncio.gather(*(lock_channel(c) for c in channels)) if c]
+            detector.locked_channels.extend(c.id for c in locked if c.id not in detector.locked_channels)
+
+            await self.add_cases(str(guild.id), [
+                self.build_case("lock", 0, self.user.id, "Anti-Raid Lockdown", {"channel_id": channel.id, "raid_id": detector.raid_id})
+                for channel in locked
+            ])
+
+        embed = discord.Embed(
+            title="Raid erkannt",
+            description=f"Mindestens **{cfg['joins']}** Joins in **{cfg['sekunden']}** Sekunden. Der Raid-Modus ist aktiv.",
+            color=0xED4245
+        )
+        embed.add_field(name="<:1710channel:1460023609081725112> Raid ID", value=f"`{detector.raid_id}`", inline=True)
+        embed.add_field(name="<:9896forum:1460023685623845040> Gesperrte Channels", value=str(len(locked)), inline=True)
+        embed.add_field(name="<:6576settings:1460023653168320546> Aktion", value=cfg["aktion"], inline=True)
+        embed.set_footer(text="Custom Moderation by Custom Discord Development")
+        embed.timestamp = discord.utils.utcnow()
+        await self.log_guild(guild, embed)
+
+        self.schedule_raid_flush(guild, detector)
+
+    def schedule_raid_flush(self, guild: discord.Guild, detector: RaidDetector):
+        """Sammelt Joins kurz und bearbeitet sie dann gemeinsam"""
+        if detector.flush_task is None or detector.flush_task.done():
+            detector.flush_task = asyncio.create_task(self.flush_raid(guild, detector))
+
+    async def flush_raid(self, guild: discord.Guild, detector: RaidDetector):
+        """Timeout oder Quarantäne für alle gesammelten Member, Cases werden gruppiert gespeichert"""
+        await asyncio.sleep(RAID_BATCH_DELAY)
+        guild_id = str(guild.id)
+        cfg = self.get_raid_config(guild_id)
+        role = guild.get_role(cfg["quarantaene_rolle"]) if cfg.get("quarantaene_rolle") else None
+        semaphore = asyncio.Semaphore(5)
+
+        async def punish(member, flags):
+            reason = f"Anti-Raid ({', '.join(flags)})"
+            async with semaphore:
+                try:
+                    if cfg["aktion"] == "timeout":
+                        await member.timeout(timedelta(minutes=cfg["timeout_minuten"]), reason=reason)
+                        return member, "timeout", reason, {"dauer": cfg["timeout_minuten"]}
+                    if cfg["aktion"] == "quarantaene" and role:
+                        await member.add_roles(role, reason=reason)
+                        return member, "quarantaene", reason, {"role_id": role.id}
+                except discord.HTTPException:
+                    pass
+            return None
+
+        handled = 0
+        while detector.pending:
+            batch = [detector.pending.popleft() for _ in range(min(RAID_BATCH_SIZE, len(detector.pending)))]
+            if cfg["aktion"] == "keine":
+                continue
+            results = [r for r in await asyncio.gather(*(punish(m, f) for m, f in batch)) if r]
+            await self.add_cases(guild_id, [
+                self.build_case(case_type, member.id, self.user.id, reason, {**extra, "raid_id": detector.raid_id})
+                for member, case_type, reason, extra in results
+            ])
+            handled += len(results)
+
+        # Ab hier kann schedule_raid_flush einen neuen Task starten, sonst gehen Joins während des Loggens verloren
+        detector.flush_task = None
+
+        if handled:
+            embed = discord.Embed(
+                title="Raid-Aktion ausgeführt",
+                description=f"**{handled}** markierte Member wurden bearbeitet ({cfg['aktion']}).",
+                color=0xF26522
+            )
+            embed.add_field(name="<:1710channel:1460023609081725112> Raid ID", value=f"`{detector.raid_id}`", inline=True)
+            embed.set_footer(text="Custom Moderation by Custom Discord Development")
+            embed.timestamp = discord.utils.utcnow()
+            await self.log_guild(guild, embed)
+
 bot = ModBot()
 
 # ============= PERMISSIONS SETUP =============
@@ -142,7 +1149,7 @@ async def setpermission(interaction: discord.Interaction, rolle: discord.Role, c
     if erlauben:
         if command not in bot.config[guild_id]["permissions"][role_id]:
             bot.config[guild_id]["permissions"][role_id].append(command)
-            bot.save_data()
+            await bot.save_config(guild_id)
             await interaction.response.send_message(
                 f"<:4569ok:1459829278572019840> Die Rolle {rolle.mention} hat nun Zugriff auf `/{command}`",
                 ephemeral=True
@@ -155,7 +1162,7 @@ async def setpermission(interaction: discord.Interaction, rolle: discord.Role, c
     else:
         if command in bot.config[guild_id]["permissions"][role_id]:
             bot.config[guild_id]["permissions"][role_id].remove(command)
-            bot.save_data()
+            await bot.save_config(guild_id)
             await interaction.response.send_message(
                 f"<:4569ok:1459829278572019840> Der Zugriff auf `/{command}` wurde für {rolle.mention} entfernt",
                 ephemeral=True
@@ -198,9 +1205,10 @@ async def permissions(interaction: discord.Interaction, rolle: discord.Role):
 @app_commands.describe(
     user="Der zu bannende User",
     grund="Grund für den Ban",
-    tage="Nachrichten der letzten X Tage löschen (0-7)"
+    tage="Nachrichten der letzten X Tage löschen (0-7)",
+    teilen="Ban an die anderen Server der Ban-Gruppe weitergeben"
 )
-async def ban(interaction: discord.Interaction, user: discord.User, grund: str = "Kein Grund angegeben", tage: int = 0):
+async def ban(interaction: discord.Interaction, user: discord.User, grund: str = "Kein Grund angegeben", tage: int = 0, teilen: bool = True):
     if not bot.has_mod_permission(interaction.user, "ban"):
         await interaction.response.send_message("<:4934error:1459829281885782157> Du hast keine Berechtigung für diesen Befehl!", ephemeral=True)
         return
@@ -216,13 +1224,19 @@ async def ban(interaction: discord.Interaction, user: discord.User, grund: str =
             delete_message_days=tage
         )
 
-        case_id = bot.add_case(
-            str(interaction.guild.id),
+        guild_id = str(interaction.guild.id)
+        group = bot.get_ban_group(guild_id) if teilen else None
+        extra = {"tage": tage}
+        if group:
+            extra["ban_gruppe"] = group
+
+        case_id = await bot.add_case(
+            guild_id,
             "ban",
             user.id,
             interaction.user.id,
             grund,
-            {"tage": tage}
+            extra
         )
 
         embed = discord.Embed(
@@ -234,6 +1248,9 @@ async def ban(interaction: discord.Interaction, user: discord.User, grund: str =
         embed.add_field(name="<:2529memberwhite:1460023620364402730> User", value=f"{user.name} ({user.id})", inline=True)
         embed.add_field(name="<:4307managerwhite:1460023635497451551> Moderator", value=interaction.user.mention, inline=True)
         embed.add_field(name="<:1701announcement:1460023604497481981> Grund", value=grund, inline=False)
+        if group:
+            targets = bot.ban_propagator.propagate(interaction.guild, user, grund, group)
+            embed.add_field(name="<:9896forum:1460023685623845040> Ban-Gruppe", value=f"An {targets} weitere Server weitergegeben", inline=False)
         embed.set_footer(text="Custom Moderation by Custom Discord Development")
         embed.timestamp = discord.utils.utcnow()
 
@@ -256,12 +1273,15 @@ async def unban(interaction: discord.Interaction, user_id: str):
         user = await bot.fetch_user(int(user_id))
         await interaction.guild.unban(user, reason=f"Entbannt von {interaction.user.name}")
 
-        case_id = bot.add_case(
+        # Entfernt den User auch von der geteilten Banliste der Gruppe
+        group = bot.get_ban_group(str(interaction.guild.id))
+        case_id = await bot.add_case(
             str(interaction.guild.id),
             "unban",
             user.id,
             interaction.user.id,
-            "Entbannt"
+            "Entbannt",
+            {"ban_gruppe": group} if group else None
         )
 
         embed = discord.Embed(
@@ -298,7 +1318,7 @@ async def kick(interaction: discord.Interaction, user: discord.Member, grund: st
     try:
         await user.kick(reason=f"{grund} | Moderator: {interaction.user.name}")
 
-        case_id = bot.add_case(
+        case_id = await bot.add_case(
             str(interaction.guild.id),
             "kick",
             user.id,
@@ -347,7 +1367,7 @@ async def timeout(interaction: discord.Interaction, user: discord.Member, dauer:
             reason=f"{grund} | Moderator: {interaction.user.name}"
         )
 
-        case_id = bot.add_case(
+        case_id = await bot.add_case(
             str(interaction.guild.id),
             "timeout",
             user.id,
@@ -387,7 +1407,7 @@ async def untimeout(interaction: discord.Interaction, user: discord.Member):
     try:
         await user.timeout(None, reason=f"Timeout entfernt | Moderator: {interaction.user.name}")
 
-        case_id = bot.add_case(
+        case_id = await bot.add_case(
             str(interaction.guild.id),
             "untimeout",
             user.id,
@@ -424,7 +1444,7 @@ async def warn(interaction: discord.Interaction, user: discord.Member, grund: st
         await interaction.response.send_message("<:4934error:1459829281885782157> Du hast keine Berechtigung für diesen Befehl!", ephemeral=True)
         return
 
-    case_id = bot.add_case(
+    case_id = await bot.add_case(
         str(interaction.guild.id),
         "warn",
         user.id,
@@ -432,23 +1452,7 @@ async def warn(interaction: discord.Interaction, user: discord.Member, grund: st
         grund
     )
 
-    # Warn zur Liste hinzufügen
     guild_id = str(interaction.guild.id)
-    user_id = str(user.id)
-    if guild_id not in bot.warns:
-        bot.warns[guild_id] = {}
-    if user_id not in bot.warns[guild_id]:
-        bot.warns[guild_id][user_id] = []
-
-    bot.warns[guild_id][user_id].append({
-        "case_id": case_id,
-        "grund": grund,
-        "moderator_id": interaction.user.id,
-        "timestamp": datetime.utcnow().isoformat()
-    })
-    bot.save_data()
-
-    warn_count = len(bot.warns[guild_id][user_id])
 
     embed = discord.Embed(
         title="User verwarnt",
@@ -466,20 +1470,17 @@ async def warn(interaction: discord.Interaction, user: discord.Member, grund: st
     await interaction.response.send_message(embed=embed)
     await bot.log_action(interaction, embed)
 
-    # DM an den User
-    try:
-        dm_embed = discord.Embed(
-            title=f"Du wurdest verwarnt - CaseID ``{case_id}``",
-            description=f"Du wurdest auf **{interaction.guild.name}** verwarnt.",
-            color=0xFEE75C
-        )
-        dm_embed.add_field(name="<:1701announcement:1460023604497481981> Grund", value=grund, inline=False)
-        dm_embed.add_field(name="<:4307managerwhite:1460023635497451551> Moderator", value=interaction.user.mention, inline=False)
-        dm_embed.timestamp = discord.utils.utcnow()
+    # DM an den User, wird im Hintergrund zugestellt
+    dm_embed = discord.Embed(
+        title=f"Du wurdest verwarnt - CaseID ``{case_id}``",
+        description=f"Du wurdest auf **{interaction.guild.name}** verwarnt.",
+        color=0xFEE75C
+    )
+    dm_embed.add_field(name="<:1701announcement:1460023604497481981> Grund", value=grund, inline=False)
+    dm_embed.add_field(name="<:4307managerwhite:1460023635497451551> Moderator", value=interaction.user.mention, inline=False)
+    dm_embed.timestamp = discord.utils.utcnow()
 
-        await user.send(embed=dm_embed)
-    except discord.Forbidden:
-        pass
+    bot.dms.send(user, dm_embed, guild_id, case_id)
 
 # ============= UNWARN COMMAND =============
 @bot.tree.command(name="unwarn", description="Entfernt eine Warnung von einem User")
@@ -493,30 +1494,18 @@ async def unwarn(interaction: discord.Interaction, user: discord.Member, case_id
         return
 
     guild_id = str(interaction.guild.id)
-    user_id = str(user.id)
 
-    if guild_id not in bot.warns or user_id not in bot.warns[guild_id]:
+    if not bot.get_active_warns(guild_id, user.id):
         await interaction.response.send_message("<:8649warning:1459829288558923859> Dieser User hat keine Verwarnungen!", ephemeral=True)
         return
 
-    # Suche die Warnung
-    warn_found = False
-    for i, warn in enumerate(bot.warns[guild_id][user_id]):
-        if warn["case_id"] == case_id:
-            bot.warns[guild_id][user_id].pop(i)
-            warn_found = True
-            break
-
-    if not warn_found:
+    # Eine aktive Warnung ist ein aktiver warn Case des Users
+    case = await bot.get_case(guild_id, case_id)
+    if not case or case["type"] != "warn" or case["user_id"] != user.id or not case.get("active", True):
         await interaction.response.send_message("<:4934error:1459829281885782157> Warnung mit dieser Case ID nicht gefunden!", ephemeral=True)
         return
 
-    # Case als inaktiv markieren
-    case = bot.get_case(guild_id, case_id)
-    if case:
-        case["active"] = False
-
-    bot.save_data()
+    await bot.deactivate_case(guild_id, case)
 
     embed = discord.Embed(
         title="Warn entfernt",
@@ -538,9 +1527,9 @@ async def unwarn(interaction: discord.Interaction, user: discord.Member, case_id
 @app_commands.describe(user="Der User")
 async def warns(interaction: discord.Interaction, user: discord.Member):
     guild_id = str(interaction.guild.id)
-    user_id = str(user.id)
+    warns_list = bot.get_active_warns(guild_id, user.id)
 
-    if guild_id not in bot.warns or user_id not in bot.warns[guild_id] or not bot.warns[guild_id][user_id]:
+    if not warns_list:
         embed = discord.Embed(
             title="<:4569ok:1459829278572019840> Keine Verwarnungen",
             description=f"{user.mention} hat keine aktiven Verwarnungen.",
@@ -553,8 +1542,6 @@ async def warns(interaction: discord.Interaction, user: discord.Member):
         await interaction.response.send_message(embed=embed)
         return
 
-    warns_list = bot.warns[guild_id][user_id]
-
     embed = discord.Embed(
         title="Verwarnungen Übersicht",
         description=f"<:2529memberwhite:1460023620364402730> {user.mention}\n<:4322search:1460023637066125352> ``{len(warns_list)}`` Verwarnungen",
@@ -567,7 +1554,7 @@ async def warns(interaction: discord.Interaction, user: discord.Member):
         timestamp = datetime.fromisoformat(warn["timestamp"])
         embed.add_field(
             name=f"<:1710channel:1460023609081725112> Case #{warn['case_id']}",
-            value=f"**<:1701announcement:1460023604497481981> Grund:** ``{warn['grund']}``\n**<:4307managerwhite:1460023635497451551> Moderator:** {moderator.mention}\n**<:6334event:1460023646881055033> Datum:** <t:{int(timestamp.timestamp())}:R>",
+            value=f"**<:1701announcement:1460023604497481981> Grund:** ``{warn['reason']}``\n**<:4307managerwhite:1460023635497451551> Moderator:** {moderator.mention}\n**<:6334event:1460023646881055033> Datum:** <t:{int(timestamp.timestamp())}:R>",
             inline=False
         )
 
@@ -595,7 +1582,7 @@ async def lock(interaction: discord.Interaction, channel: Optional[discord.TextC
         overwrites.send_messages = False
         await channel.set_permissions(interaction.guild.default_role, overwrite=overwrites, reason=f"{grund} | Moderator: {interaction.user.name}")
 
-        case_id = bot.add_case(
+        case_id = await bot.add_case(
             str(interaction.guild.id),
             "lock",
             0,  # Kein User, sondern Channel
@@ -639,7 +1626,7 @@ async def unlock(interaction: discord.Interaction, channel: Optional[discord.Tex
         overwrites.send_messages = None
         await channel.set_permissions(interaction.guild.default_role, overwrite=overwrites, reason=f"Entsperrt von {interaction.user.name}")
 
-        case_id = bot.add_case(
+        case_id = await bot.add_case(
             str(interaction.guild.id),
             "unlock",
             0,
@@ -666,6 +1653,32 @@ async def unlock(interaction: discord.Interaction, channel: Optional[discord.Tex
         await interaction.response.send_message(f"<:4934error:1459829281885782157> Fehler beim Entsperren: {str(e)}", ephemeral=True)
 
 # ============= REPORT COMMAND =============
+def build_report_embed(user: discord.Member, case: dict) -> discord.Embed:
+    """Baut das Report Embed für die Mods, bei zusammengefassten Reports mit allen Reportern"""
+    count = case.get("report_count", 1)
+    reporters = case.get("reporters", [case["moderator_id"]])
+    reasons = case.get("reasons", [case["reason"]])
+
+    embed = discord.Embed(
+        title="Neuer Report" if count == 1 else f"Neuer Report ({count} Meldungen)",
+        description=f"**{user.mention}** wurde gemeldet.",
+        color=0xED4245
+    )
+    embed.add_field(name="<:1710channel:1460023609081725112> Case ID", value=f"`#{case['case_id']}`", inline=True)
+    embed.add_field(name="<:2529memberwhite:1460023620364402730> Gemeldeter User", value=f"{user.mention} ({user.id})", inline=True)
+    reporter_text = ", ".join(f"<@{r}>" for r in reporters)
+    if count > len(reporters):
+        reporter_text += f" und {count - len(reporters)} weitere"
+    embed.add_field(name="<:4307managerwhite:1460023635497451551> Gemeldet von", value=reporter_text, inline=True)
+    embed.add_field(name="<:1701announcement:1460023604497481981> Grund", value="\n".join(f"• {r}" for r in reasons)[:1024], inline=False)
+    if "triage" in case:
+        embed.add_field(name="<:6576settings:1460023653168320546> Einstufung", value=f"Schwere: ``{case['triage']['schwere']}`` | Kategorie: ``{case['triage']['kategorie']}``", inline=False)
+    embed.set_thumbnail(url=user.display_avatar.url)
+    embed.set_image(url=user.display_avatar.url)
+    embed.set_footer(text="Custom Moderation by Custom Discord Development")
+    embed.timestamp = discord.utils.utcnow()
+    return embed
+
 @bot.tree.command(name="report", description="Meldet einen User an die Moderatoren")
 @app_commands.describe(
     user="Der zu meldende User",
@@ -689,35 +1702,89 @@ async def report(interaction: discord.Interaction, user: discord.Member, grund:
         await interaction.response.send_message("<:4934error:1459829281885782157> Report-Channel nicht gefunden!", ephemeral=True)
         return
 
-    case_id = bot.add_case(
-        guild_id,
-        "report",
-        user.id,
-        interaction.user.id,
-        grund
-    )
+    limiter = bot.report_limiters.get(guild_id)
+    if limiter is None:
+        limiter = bot.report_limiters[guild_id] = ReportLimiter()
+    now = time.monotonic()
+    reporter_id = interaction.user.id
 
-    # Report Embed für Mods
-    embed = discord.Embed(
-        title="Neuer Report",
-        description=f"**{user.mention}** wurde gemeldet.",
-        color=0xED4245
-    )
-    embed.add_field(name="<:1710channel:1460023609081725112> Case ID", value=f"`#{case_id}`", inline=True)
-    embed.add_field(name="<:2529memberwhite:1460023620364402730> Gemeldeter User", value=f"{user.mention} ({user.id})", inline=True)
-    embed.add_field(name="<:4307managerwhite:1460023635497451551> Gemeldet von", value=f"{interaction.user.mention}", inline=True)
-    embed.add_field(name="<:1701announcement:1460023604497481981> Grund", value=grund, inline=False)
-    embed.set_thumbnail(url=user.display_avatar.url)
-    embed.set.image(url=user.display_avatar.url)
-    embed.set_footer(text="Custom Moderation by Custom Discord Development")
-    embed.timestamp = discord.utils.utcnow()
+    # Doppelte Reports desselben Users kosten nichts und erzeugen nichts
+    open_report = limiter.get_open(user.id, now)
+    if open_report and reporter_id in open_report["reporters"]:
+        await interaction.response.send_message(
+            f"<:8649warning:1459829288558923859> Du hast **{user.name}** bereits gemeldet (Case `#{open_report['case_id']}`).",
+            ephemeral=True
+        )
+        return
 
-    await report_channel.send(embed=embed)
+    if not limiter.allow(reporter_id, now):
+        await interaction.response.send_message(
+            f"<:8649warning:1459829288558923859> Du sendest zu viele Reports! Versuche es in {limiter.retry_after(reporter_id, now)} Sekunden erneut.",
+            ephemeral=True
+        )
+        return
+
+    case_data = await bot.get_case(guild_id, open_report["case_id"]) if open_report else None
+    if case_data and case_data.get("active", True):
+        # Report zum bestehenden Case hinzufügen und die Nachricht aktualisieren
+        open_report["reporters"].add(reporter_id)
+        case_data["report_count"] = case_data.get("report_count", 1) + 1
+        if len(case_data.setdefault("reporters", [case_data["moderator_id"]])) < REPORT_MAX_REASONS:
+            case_data["reporters"].append(reporter_id)
+        reasons = case_data.setdefault("reasons", [case_data["reason"]])
+        if grund not in reasons and len(reasons) < REPORT_MAX_REASONS:
+            reasons.append(grund)
+        await bot.update_case(guild_id, case_data, "report_count", "reporters", "reasons")
+
+        try:
+            await report_channel.get_partial_message(open_report["message_id"]).edit(embed=build_report_embed(user, case_data))
+        except discord.HTTPException:
+            try:
+                message = await report_channel.send(embed=build_report_embed(user, case_data))
+            except discord.HTTPException:
+                await interaction.response.send_message(
+                    f"<:4934error:1459829281885782157> Dein Report wurde zu Case `#{case_data['case_id']}` gespeichert, aber die Moderatoren konnten nicht benachrichtigt werden!",
+                    ephemeral=True
+                )
+                return
+            open_report["message_id"] = case_data["message_id"] = message.id
+            await bot.update_case(guild_id, case_data, "message_id")
+
+        case_id = case_data["case_id"]
+        confirm_text = f"Dein Report zu **{user.name}** wurde dem offenen Report hinzugefügt."
+    else:
+        case_id = await bot.add_case(
+            guild_id,
+            "report",
+            user.id,
+            reporter_id,
+            grund,
+            {"reporters": [reporter_id], "reasons": [grund], "report_count": 1},
+            save=False
+        )
+        case_data = await bot.get_case(guild_id, case_id)
+
+        try:
+            message = await report_channel.send(embed=build_report_embed(user, case_data))
+        except discord.HTTPException:
+            # Case bleibt nachvollziehbar, zählt aber nicht als offener Report
+            case_data["zustellung"] = "fehlgeschlagen"
+            await bot.deactivate_case(guild_id, case_data, "zustellung")
+            limiter.refund(reporter_id)
+            await interaction.response.send_message(
+                "<:4934error:1459829281885782157> Dein Report konnte nicht an die Moderatoren gesendet werden! Bitte versuche es später erneut.",
+                ephemeral=True
+            )
+            return
+        case_data["message_id"] = message.id
+        await bot.update_case(guild_id, case_data, "message_id")
+        limiter.open(user.id, case_id, message.id, reporter_id, now)
+        confirm_text = f"Dein Report zu **{user.name}** wurde an die Moderatoren weitergeleitet."
 
     # Bestätigung an User
     confirm_embed = discord.Embed(
         title="<:4569ok:1459829278572019840> Report gesendet",
-        description=f"Dein Report zu **{user.name}** wurde an die Moderatoren weitergeleitet.",
+        description=confirm_text,
         color=0x57F287
     )
     confirm_embed.add_field(name="<:1710channel:1460023609081725112> Case ID", value=f"`#{case_id}`", inline=False)
@@ -725,18 +1792,66 @@ async def report(interaction: discord.Interaction, user: discord.Member, grund:
 
     await interaction.response.send_message(embed=confirm_embed, ephemeral=True)
 
+    # Einstufung läuft im Hintergrund, die Bestätigung wartet nie darauf
+    if bot.triage:
+        bot.spawn(apply_triage(report_channel, user, case_id, bot.triage.submit(grund)))
+
+async def apply_triage(report_channel: discord.TextChannel, user: discord.Member, case_id: int, future: asyncio.Future):
+    """Speichert die Einstufung am Case und aktualisiert das Report Embed"""
+    result = await future
+    if result is None:
+        return
+
+    guild_id = str(report_channel.guild.id)
+    case_data = await bot.get_case(guild_id, case_id)
+    if not case_data:
+        return
+
+    # Bei zusammengefassten Reports zählt die höchste Schwere
+    previous = case_data.get("triage")
+    if previous and SEVERITIES.index(previous["schwere"]) >= SEVERITIES.index(result["schwere"]):
+        return
+    case_data["triage"] = result
+    await bot.update_case(guild_id, case_data, "triage")
+
+    if "message_id" in case_data:
+        try:
+            await report_channel.get_partial_message(case_data["message_id"]).edit(embed=build_report_embed(user, case_data))
+        except discord.HTTPException:
+            pass
+
+    # Optionale Eskalation: Rolle bei schweren Reports einmalig pingen
+    role_id = bot.config.get(guild_id, {}).get("eskalations_rolle")
+    if role_id and result["schwere"] == "hoch" and not case_data.get("eskaliert"):
+        case_data["eskaliert"] = True
+        await bot.update_case(guild_id, case_data, "eskaliert")
+        try:
+            await report_channel.send(
+                f"<@&{role_id}> Report `#{case_id}` wurde als **{result['kategorie']}** mit hoher Schwere eingestuft.",
+                allowed_mentions=discord.AllowedMentions(roles=True)
+            )
+        except discord.HTTPException:
+            pass
+
 # ============= SET REPORT CHANNEL =============
 @bot.tree.command(name="setreportchannel", description="Setzt den Channel für Reports")
-@app_commands.describe(channel="Der Report-Channel")
+@app_commands.describe(
+    channel="Der Report-Channel",
+    eskalations_rolle="Rolle, die bei schweren Reports gepingt wird (nur mit aktiver Triage)"
+)
 @app_commands.checks.has_permissions(administrator=True)
-async def setreportchannel(interaction: discord.Interaction, channel: discord.TextChannel):
+async def setreportchannel(interaction: discord.Interaction, channel: discord.TextChannel, eskalations_rolle: Optional[discord.Role] = None):
     guild_id = str(interaction.guild.id)
 
     if guild_id not in bot.config:
         bot.config[guild_id] = {}
 
     bot.config[guild_id]["report_channel"] = channel.id
-    bot.save_data()
+    if eskalations_rolle:
+        bot.config[guild_id]["eskalations_rolle"] = eskalations_rolle.id
+    else:
+        bot.config[guild_id].pop("eskalations_rolle", None)
+    await bot.save_config(guild_id)
 
     await interaction.response.send_message(
         f"<:4569ok:1459829278572019840> Report-Channel wurde auf {channel.mention} gesetzt!",
@@ -754,7 +1869,7 @@ async def setlogchannel(interaction: discord.Interaction, channel: discord.TextC
         bot.config[guild_id] = {}
         
     bot.config[guild_id]["log_channel"] = channel.id
-    bot.save_data()
+    await bot.save_config(guild_id)
     
     await interaction.response.send_message(
         f"<:4569ok:1459829278572019840> Log-Channel wurde auf {channel.mention} gesetzt!",
@@ -763,16 +1878,19 @@ async def setlogchannel(interaction: discord.Interaction, channel: discord.TextC
 
 # ============= CASE COMMAND =============
 @bot.tree.command(name="case", description="Zeigt Informationen zu einem Case")
-@app_commands.describe(case_id="Die Case ID")
-async def case(interaction: discord.Interaction, case_id: int):
+@app_commands.describe(
+    case_id="Die Case ID",
+    user="Nur Cases dieses Users (die Auswahl zeigt dann seine letzten Cases)"
+)
+async def case(interaction: discord.Interaction, case_id: int, user: Optional[discord.User] = None):
     guild_id = str(interaction.guild.id)
-    case_data = bot.get_case(guild_id, case_id)
+    case_data = await bot.get_case(guild_id, case_id)
 
-    if not case_data:
+    if not case_data or (user and case_data["user_id"] != user.id):
         await interaction.response.send_message("<:4934error:1459829281885782157> Case nicht gefunden!", ephemeral=True)
         return
 
-    user = await bot.fetch_user(case_data["user_id"]) if case_data["user_id"] != 0 else None
+    case_user = await bot.fetch_user(case_data["user_id"]) if case_data["user_id"] != 0 else None
     moderator = await bot.fetch_user(case_data["moderator_id"])
     timestamp = datetime.fromisoformat(case_data["timestamp"])
 
@@ -787,7 +1905,8 @@ async def case(interaction: discord.Interaction, case_id: int):
         "lock": ("🔒", "Lock", 0xED4245),
         "unlock": ("🔓", "Unlock", 0x57F287),
         "report": ("🚨", "Report", 0xED4245),
-        "clear": ("🗑️", "Clear", 0x57F287)
+        "clear": ("🗑️", "Clear", 0x57F287),
+        "quarantaene": ("🚧", "Quarantäne", 0xF26522)
     }
 
     emoji, type_name, color = type_info.get(case_data["type"], ("📋", case_data["type"], 0x5865F2))
@@ -797,8 +1916,8 @@ async def case(interaction: discord.Interaction, case_id: int):
         color=color
     )
 
-    if user:
-        embed.add_field(name="<:2529memberwhite:1460023620364402730> User", value=f"{user.mention} (``{user.id}``)", inline=True)
+    if case_user:
+        embed.add_field(name="<:2529memberwhite:1460023620364402730> User", value=f"{case_user.mention} (``{case_user.id}``)", inline=True)
     elif "channel_id" in case_data:
         channel = interaction.guild.get_channel(case_data["channel_id"])
         embed.add_field(name="<:9896forum:1460023685623845040> Channel", value=channel.mention if channel else "Unbekannt", inline=True)
@@ -813,7 +1932,240 @@ async def case(interaction: discord.Interaction, case_id: int):
         embed.add_field(name="<:8045slowmode:1460023665663017065> Dauer", value=f"{case_data['dauer']} Minuten", inline=True)
     if "tage" in case_data:
         embed.add_field(name="<:2854copy:1460023622805491936> Nachrichten", value=f"{case_data['tage']} Tage gelöscht", inline=True)
+    if "dm_status" in case_data:
+        embed.add_field(name="<:1701announcement:1460023604497481981> DM", value=f"``{case_data['dm_status']}``", inline=True)
+
+    embed.set_footer(text="Custom Moderation by Custom Discord Development")
+    embed.timestamp = discord.utils.utcnow()
+
+    await interaction.response.send_message(embed=embed)
+    await bot.log_action(interaction, embed)
+
+# ============= EXPORT COMMAND =============
+EXPORT_FIELDS = ["case_id", "type", "user_id", "moderator_id", "reason", "timestamp", "active"]
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024   # Bis 8 MB im Speicher, danach temporäre Datei
+EXPORT_CHUNK_SIZE = 500               # Cases pro Block
+
+class ExportFile:
+    """Gzip-komprimierter Export in eine Spooled Temp File, Serialisieren und Schreiben sind getrennt"""
+
+    def __init__(self, export_format: str):
+        self.format = export_format
+        self.spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+        self.gz = gzip.GzipFile(fileobj=self.spool, mode="wb")
+        self.count = 0
+        if export_format == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(EXPORT_FIELDS + ["extra"])
+            self.gz.write(buffer.getvalue().encode("utf-8"))
+
+    def encode(self, cases: list) -> bytes:
+        """Serialisiert einen Block Cases (im JSON Modus auf dem Event Loop, dort ändern sich die Cases)"""
+        buffer = io.StringIO()
+        if self.format == "csv":
+            writer = csv.writer(buffer)
+            for case in cases:
+                extra = {k: v for k, v in case.items() if k not in EXPORT_FIELDS}
+                writer.writerow([case.get(field) for field in EXPORT_FIELDS] + [json.dumps(extra, ensure_ascii=False) if extra else ""])
+        else:
+            for case in cases:
+                buffer.write(json.dumps(case, ensure_ascii=False))
+                buffer.write("\n")
+        self.count += len(cases)
+        return buffer.getvalue().encode("utf-8")
+
+    def write(self, data: bytes):
+        self.gz.write(data)
+
+    def finish(self):
+        self.gz.close()
+        size = self.spool.tell()
+        self.spool.seek(0)
+        return self.spool, self.count, size
+
+    def discard(self):
+        """Schließt die Temp File nach einem Fehler"""
+        try:
+            self.gz.close()
+        finally:
+            self.spool.close()
+
+def write_export(cases, export_format: str):
+    """Schreibt Cases aus der Datenbank gestreamt in den Export (läuft komplett im Thread)"""
+    export = ExportFile(export_format)
+    try:
+        while True:
+            chunk = list(islice(cases, EXPORT_CHUNK_SIZE))
+            if not chunk:
+                return export.finish()
+            export.write(export.encode(chunk))
+    except BaseException:
+        export.discard()
+        cases.close()
+        raise
+
+@bot.tree.command(name="export", description="Exportiert die Case-Historie als Datei")
+@app_commands.describe(
+    dateiformat="Dateiformat",
+    user="Nur Cases dieses Users",
+    typ="Nur Cases dieses Typs (z.B. ban, warn, timeout)",
+    von="Startdatum (JJJJ-MM-TT)",
+    bis="Enddatum inklusive (JJJJ-MM-TT)"
+)
+async def export(interaction: discord.Interaction, dateiformat: Literal["jsonl", "csv"] = "jsonl", user: Optional[discord.User] = None, typ: Optional[str] = None, von: Optional[str] = None, bis: Optional[str] = None):
+    if not bot.has_mod_permission(interaction.user, "export"):
+        await interaction.response.send_message("<:4934error:1459829281885782157> Du hast keine Berechtigung für diesen Befehl!", ephemeral=True)
+        return
+
+    try:
+        start = datetime.strptime(von, "%Y-%m-%d").isoformat() if von else None
+        end = (datetime.strptime(bis, "%Y-%m-%d") + timedelta(days=1)).isoformat() if bis else None
+    except ValueError:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Datum muss im Format JJJJ-MM-TT angegeben werden!", ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True)
+
+    guild_id = str(interaction.guild.id)
+    cases = bot.iter_cases(guild_id, user.id if user else None, typ, start, end)
+    try:
+        if bot.db:
+            # Die Cases kommen frisch aus der Datenbank, der Generator wird komplett im Thread verbraucht
+            spool, count, size = await bot.db.run(write_export, cases, dateiformat)
+        else:
+            # Die Cases im Speicher ändert der Event Loop laufend, daher dort blockweise serialisieren
+            # und nur Kompression und Schreiben in den Thread geben
+            export = ExportFile(dateiformat)
+            try:
+                while True:
+                    chunk = list(islice(cases, EXPORT_CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    await asyncio.to_thread(export.write, export.encode(chunk))
+                spool, count, size = await asyncio.to_thread(export.finish)
+            except BaseException:
+                export.discard()
+                raise
+    except Exception as e:
+        await interaction.followup.send(f"<:4934error:1459829281885782157> Fehler beim Export: {str(e)}", ephemeral=True)
+        return
+
+    try:
+        if count == 0:
+            await interaction.followup.send("<:8649warning:1459829288558923859> Keine passenden Cases gefunden!", ephemeral=True)
+            return
+
+        if size > interaction.guild.filesize_limit:
+            await interaction.followup.send("<:4934error:1459829281885782157> Der Export ist zu groß für Discord! Bitte schränke die Filter ein.", ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title="Cases exportiert",
+            description=f"**{count}** Cases wurden exportiert.",
+            color=0x57F287
+        )
+        embed.add_field(name="<:4307managerwhite:1460023635497451551> Moderator", value=interaction.user.mention, inline=True)
+        embed.add_field(name="<:2854copy:1460023622805491936> Format", value=f"``{dateiformat}``", inline=True)
+        if user:
+            embed.add_field(name="<:2529memberwhite:1460023620364402730> User", value=f"{user.name} (``{user.id}``)", inline=True)
+        if typ:
+            embed.add_field(name="<:1710channel:1460023609081725112> Typ", value=f"``{typ}``", inline=True)
+        if von or bis:
+            embed.add_field(name="<:6334event:1460023646881055033> Zeitraum", value=f"{von or 'Anfang'} bis {bis or 'heute'}", inline=True)
+        embed.set_footer(text="Custom Moderation by Custom Discord Development")
+        embed.timestamp = discord.utils.utcnow()
+
+        await interaction.followup.send(embed=embed, file=discord.File(spool, filename=f"cases-{guild_id}.{dateiformat}.gz"), ephemeral=True)
+        await bot.log_action(interaction, embed)
+    finally:
+        spool.close()
 
+# ============= MODSTATS COMMAND =============
+@bot.tree.command(name="modstats", description="Zeigt Moderations-Statistiken")
+@app_commands.describe(
+    moderator="Nur Aktionen dieses Moderators",
+    tage="Zeitraum in Tagen bis heute bzw. bis zum Enddatum (1-365)",
+    von="Startdatum (JJJJ-MM-TT), ersetzt tage",
+    bis="Enddatum inklusive (JJJJ-MM-TT)",
+    neu_berechnen="Statistik aus der Case-Historie neu aufbauen (nur Admins)"
+)
+async def modstats(interaction: discord.Interaction, moderator: Optional[discord.Member] = None, tage: int = 30, von: Optional[str] = None, bis: Optional[str] = None, neu_berechnen: bool = False):
+    if not bot.has_mod_permission(interaction.user, "modstats"):
+        await interaction.response.send_message("<:4934error:1459829281885782157> Du hast keine Berechtigung für diesen Befehl!", ephemeral=True)
+        return
+
+    if tage < 1 or tage > 365:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Tage müssen zwischen 1 und 365 liegen!", ephemeral=True)
+        return
+
+    try:
+        end = datetime.strptime(bis, "%Y-%m-%d").date() if bis else datetime.utcnow().date()
+        start = datetime.strptime(von, "%Y-%m-%d").date() if von else end - timedelta(days=tage - 1)
+    except ValueError:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Datum muss im Format JJJJ-MM-TT angegeben werden!", ephemeral=True)
+        return
+
+    if start > end:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Das Startdatum muss vor dem Enddatum liegen!", ephemeral=True)
+        return
+
+    if neu_berechnen:
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("<:4934error:1459829281885782157> Nur Admins können die Statistik neu berechnen!", ephemeral=True)
+            return
+        bot.rebuild_stats()
+        bot.save_data()
+
+    # Nur die Tages-Buckets im Zeitraum lesen, nie die Cases selbst
+    guild_stats = bot.stats.get(str(interaction.guild.id), {})
+    moderator_id = str(moderator.id) if moderator else None
+    per_type = Counter()
+    per_moderator = Counter()
+    deactivated = 0
+
+    span = (end - start).days + 1
+    if span > len(guild_stats):
+        # Langer Zeitraum: nur die vorhandenen Buckets prüfen, ISO Daten sind als String sortierbar
+        days = [day for key, day in guild_stats.items() if start.isoformat() <= key <= end.isoformat()]
+    else:
+        days = (guild_stats.get((start + timedelta(days=offset)).isoformat()) for offset in range(span))
+
+    for day in days:
+        if not day:
+            continue
+        for mod_id, types in day.items():
+            if moderator_id and mod_id != moderator_id:
+                continue
+            for case_type, (total, inactive) in types.items():
+                per_type[case_type] += total
+                if mod_id != STATS_REPORT_BUCKET:
+                    per_moderator[mod_id] += total
+                deactivated += inactive
+
+    total = sum(per_type.values())
+    period = f"Letzte ``{tage}`` Tage" if not von and not bis else f"``{start.isoformat()}`` bis ``{end.isoformat()}``"
+
+    embed = discord.Embed(
+        title="Moderations-Statistik",
+        description=f"<:6334event:1460023646881055033> {period}\n<:4322search:1460023637066125352> ``{total}`` Aktionen",
+        color=0x5865F2
+    )
+    if moderator:
+        embed.set_thumbnail(url=moderator.display_avatar.url)
+        embed.add_field(name="<:4307managerwhite:1460023635497451551> Moderator", value=moderator.mention, inline=True)
+
+    embed.add_field(
+        name="<:1710channel:1460023609081725112> Nach Typ",
+        value="\n".join(f"``{case_type}``: {count}" for case_type, count in per_type.most_common()) or "Keine",
+        inline=True
+    )
+    if not moderator:
+        embed.add_field(
+            name="<:4307managerwhite:1460023635497451551> Top Moderatoren",
+            value="\n".join(f"<@{mod_id}>: {count}" for mod_id, count in per_moderator.most_common(10)) or "Keine",
+            inline=True
+        )
+    embed.add_field(name="<:6576settings:1460023653168320546> Deaktiviert", value=f"{deactivated} Cases", inline=True)
     embed.set_footer(text="Custom Moderation by Custom Discord Development")
     embed.timestamp = discord.utils.utcnow()
 
@@ -836,7 +2188,7 @@ async def clear(interaction: discord.Interaction, anzahl: int):
         await interaction.response.defer(ephemeral=True)
         deleted = await interaction.channel.purge(limit=anzahl)
 
-        case_id = bot.add_case(
+        case_id = await bot.add_case(
             str(interaction.guild.id),
             "clear",
             0,
@@ -882,10 +2234,8 @@ async def userinfo(interaction: discord.Interaction, user: discord.Member = None
     embed.add_field(name="<:1706developerwhite:1460023607596945439> Bot", value="``Ja``" if user.bot else "``Nein``", inline=True)
 
     # Verwarnungen anzeigen
-    guild_id = str(interaction.guild.id)
-    user_id = str(user.id)
-    if guild_id in bot.warns and user_id in bot.warns[guild_id]:
-        warn_count = len(bot.warns[guild_id][user_id])
+    warn_count = len(bot.get_active_warns(str(interaction.guild.id), user.id))
+    if warn_count:
         embed.add_field(name="<:3259moderatorwhite:1460023630984380590> Verwarnungen", value=f"{warn_count} Verwarnungen", inline=True)
 
     embed.set_footer(text="Custom Moderation by Custom Discord Development", icon_url=bot.user.display_avatar.url)
@@ -920,6 +2270,268 @@ async def serverinfo(interaction: discord.Interaction):
     await interaction.response.send_message(embed=embed)
     await bot.log_action(interaction, embed)
 
+# ============= BAN-GRUPPE COMMAND =============
+@bot.tree.command(name="bangruppe", description="Verwaltet die geteilte Banliste mit anderen Servern")
+@app_commands.describe(
+    aktion="Gruppe erstellen, einen Server einladen, einer Einladung folgen, verlassen oder anzeigen",
+    server_id="ID des Servers, der eingeladen werden soll (nur beim Einladen)",
+    einladung="Einladungscode eines Servers der Gruppe (nur beim Beitreten)"
+)
+@app_commands.checks.has_permissions(administrator=True)
+async def bangruppe(interaction: discord.Interaction, aktion: Literal["erstellen", "einladen", "beitreten", "verlassen", "anzeigen"], server_id: Optional[str] = None, einladung: Optional[str] = None):
+    guild_id = str(interaction.guild.id)
+    group = bot.get_ban_group(guild_id)
+
+    if aktion in ("erstellen", "beitreten") and group:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Dieser Server ist bereits in einer Ban-Gruppe! Verlasse sie zuerst.", ephemeral=True)
+        return
+    if aktion in ("einladen", "verlassen", "anzeigen") and not group:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Dieser Server ist in keiner Ban-Gruppe!", ephemeral=True)
+        return
+
+    if aktion == "erstellen":
+        # Die Gruppen-ID wird nie angezeigt, Beitritt nur über Einladungen
+        bot.config.setdefault(guild_id, {})["ban_gruppe"] = secrets.token_hex(16)
+        await bot.save_config(guild_id)
+        await interaction.response.send_message("<:4569ok:1459829278572019840> Ban-Gruppe erstellt. Lade andere Server mit `/bangruppe einladen` ein.", ephemeral=True)
+        return
+
+    if aktion == "einladen":
+        if not server_id or not server_id.isdigit() or int(server_id) == interaction.guild.id:
+            await interaction.response.send_message("<:8649warning:1459829288558923859> Bitte gib die ID eines anderen Servers an!", ephemeral=True)
+            return
+        token = await bot.create_ban_invite(guild_id, int(server_id))
+        await interaction.response.send_message(
+            f"<:4569ok:1459829278572019840> Einladung für Server ``{server_id}`` erstellt. Ein Admin dort führt aus:\n"
+            f"`/bangruppe aktion:beitreten einladung:{token}`\n"
+            f"Der Code gilt einmalig, nur für diesen Server und {BAN_INVITE_TTL // 3600} Stunden.",
+            ephemeral=True
+        )
+        return
+
+    if aktion == "beitreten":
+        if not einladung:
+            await interaction.response.send_message("<:8649warning:1459829288558923859> Bitte gib einen Einladungscode an!", ephemeral=True)
+            return
+        inviter_id = await bot.redeem_ban_invite(guild_id, einladung.strip())
+        if inviter_id is None:
+            await interaction.response.send_message("<:4934error:1459829281885782157> Ungültige oder abgelaufene Einladung!", ephemeral=True)
+            return
+        inviter = bot.get_guild(int(inviter_id))
+        await interaction.response.send_message(f"<:4569ok:1459829278572019840> Der Server ist der Ban-Gruppe von **{inviter.name if inviter else inviter_id}** beigetreten.", ephemeral=True)
+        return
+
+    if aktion == "verlassen":
+        bot.config[guild_id].pop("ban_gruppe")
+        bot.config[guild_id].pop("ban_einladungen", None)
+        await bot.save_config(guild_id)
+        await interaction.response.send_message("<:4569ok:1459829278572019840> Der Server hat die Ban-Gruppe verlassen.", ephemeral=True)
+        return
+
+    guilds = bot.group_guilds(group)
+    embed = discord.Embed(
+        title="Ban-Gruppe",
+        description="Dieser Server ist Mitglied einer Ban-Gruppe.",
+        color=0x5865F2
+    )
+    embed.add_field(name="<:9896forum:1460023685623845040> Server", value="\n".join(g.name for g in guilds[:20]) + (f"\n… und {len(guilds) - 20} weitere" if len(guilds) > 20 else ""), inline=True)
+    embed.add_field(name="<:4934error:1459829281885782157> Gebannte User", value=str(len(bot.shared_bans.get(group, ()))), inline=True)
+    embed.set_footer(text="Custom Moderation by Custom Discord Development")
+    embed.timestamp = discord.utils.utcnow()
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# ============= TRACES COMMAND =============
+@bot.tree.command(name="traces", description="Zeigt die letzten Tracing-Spans (Performance)")
+@app_commands.describe(
+    anzahl="Anzahl der Einträge (1-50)",
+    suche="Nur Spans, deren Name oder Command diesen Text enthält"
+)
+@app_commands.checks.has_permissions(administrator=True)
+async def traces(interaction: discord.Interaction, anzahl: int = 20, suche: Optional[str] = None):
+    if not tracer.enabled:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Tracing ist deaktiviert! Setze `TRACE=1` in der Umgebung.", ephemeral=True)
+        return
+
+    entries = tracer.recent(max(1, min(anzahl, 50)), suche)
+    if not entries:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Keine Spans vorhanden!", ephemeral=True)
+        return
+
+    lines = []
+    for timestamp, trace, name, duration_ms, attrs in entries:
+        extra = " ".join(f"{k}={v}" for k, v in attrs.items() if k != "stack")
+        lines.append(f"{datetime.utcfromtimestamp(timestamp):%H:%M:%S} {duration_ms:8.1f}ms {trace} {name} {extra}".rstrip())
+
+    # Embed-Beschreibung ist auf 4096 Zeichen begrenzt, neueste Einträge behalten
+    text = "\n".join(lines)[-4000:]
+    embed = discord.Embed(
+        title="Tracing",
+        description=f"```\n{text}\n```",
+        color=0x5865F2
+    )
+    embed.set_footer(text="Custom Moderation by Custom Discord Development")
+    embed.timestamp = discord.utils.utcnow()
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# ============= ANTI-RAID COMMANDS =============
+@bot.tree.command(name="antiraid", description="Konfiguriert die automatische Raid-Erkennung")
+@app_commands.describe(
+    aktiv="Raid-Erkennung aktivieren oder deaktivieren",
+    joins="Anzahl Joins, ab der ein Raid erkannt wird",
+    sekunden="Zeitfenster für die Joins in Sekunden",
+    aktion="Was mit markierten Membern passiert",
+    lockdown="Alle Channels bei einem Raid automatisch sperren",
+    quarantaene_rolle="Rolle für die Aktion quarantaene"
+)
+@app_commands.checks.has_permissions(administrator=True)
+async def antiraid(interaction: discord.Interaction, aktiv: bool, joins: int = 10, sekunden: int = 10, aktion: Literal["timeout", "quarantaene", "keine"] = "timeout", lockdown: bool = True, quarantaene_rolle: Optional[discord.Role] = None):
+    if joins < 2 or sekunden < 1:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Mindestens 2 Joins und 1 Sekunde!", ephemeral=True)
+        return
+
+    if aktion == "quarantaene" and not quarantaene_rolle:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Für die Quarantäne wird eine Rolle benötigt!", ephemeral=True)
+        return
+
+    guild_id = str(interaction.guild.id)
+    if guild_id not in bot.config:
+        bot.config[guild_id] = {}
+
+    bot.config[guild_id]["antiraid"] = {
+        "aktiv": aktiv,
+        "joins": joins,
+        "sekunden": sekunden,
+        "aktion": aktion,
+        "lockdown": lockdown,
+        "quarantaene_rolle": quarantaene_rolle.id if quarantaene_rolle else None
+    }
+    await bot.save_config(guild_id)
+
+    embed = discord.Embed(
+        title="Anti-Raid konfiguriert",
+        description=f"Die Raid-Erkennung ist {'aktiv' if aktiv else 'deaktiviert'}.",
+        color=0x57F287 if aktiv else 0xED4245
+    )
+    embed.add_field(name="<:2529memberwhite:1460023620364402730> Schwelle", value=f"{joins} Joins / {sekunden} Sekunden", inline=True)
+    embed.add_field(name="<:6576settings:1460023653168320546> Aktion", value=aktion, inline=True)
+    embed.add_field(name="<:9896forum:1460023685623845040> Lockdown", value="``Ja``" if lockdown else "``Nein``", inline=True)
+    embed.set_footer(text="Custom Moderation by Custom Discord Development")
+    embed.timestamp = discord.utils.utcnow()
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+    await bot.log_action(interaction, embed)
+
+@bot.tree.command(name="raidende", description="Beendet den Raid-Modus und entsperrt die gesperrten Channels")
+async def raidende(interaction: discord.Interaction):
+    if not bot.has_mod_permission(interaction.user, "antiraid"):
+        await interaction.response.send_message("<:4934error:1459829281885782157> Du hast keine Berechtigung für diesen Befehl!", ephemeral=True)
+        return
+
+    guild_id = str(interaction.guild.id)
+    detector = bot.raid_detectors.get(guild_id)
+    if not detector or detector.raid_id is None:
+        await interaction.response.send_message("<:8649warning:1459829288558923859> Es ist kein Raid aktiv!", ephemeral=True)
+        return
+
+    await interaction.response.defer()
+
+    cases = []
+    for channel_id in detector.locked_channels:
+        channel = interaction.guild.get_channel(channel_id)
+        if not channel:
+            continue
+        overwrites = channel.overwrites_for(interaction.guild.default_role)
+        overwrites.send_messages = None
+        try:
+            await channel.set_permissions(interaction.guild.default_role, overwrite=overwrites, reason=f"Raid beendet von {interaction.user.name}")
+        except discord.HTTPException:
+            continue
+        cases.append(bot.build_case("unlock", 0, interaction.user.id, "Raid beendet", {"channel_id": channel.id, "raid_id": detector.raid_id}))
+    await bot.add_cases(guild_id, cases)
+    unlocked = len(cases)
+
+    embed = discord.Embed(
+        title="Raid beendet",
+        description=f"Der Raid-Modus wurde beendet, **{unlocked}** Channels wurden entsperrt.",
+        color=0x57F287
+    )
+    embed.add_field(name="<:1710channel:1460023609081725112> Raid ID", value=f"`{detector.raid_id}`", inline=True)
+    embed.add_field(name="<:4307managerwhite:1460023635497451551> Moderator", value=interaction.user.mention, inline=True)
+    embed.set_footer(text="Custom Moderation by Custom Discord Development")
+    embed.timestamp = discord.utils.utcnow()
+
+    detector.raid_until = 0.0
+    detector.raid_id = None
+    detector.locked_channels = []
+
+    await interaction.followup.send(embed=embed)
+    await bot.log_action(interaction, embed)
+
+# ============= AUTOCOMPLETE =============
+def case_choice(case_data: dict) -> app_commands.Choice[int]:
+    return app_commands.Choice(name=f"#{case_data['case_id']} {case_data['type']} - {case_data['reason']}"[:100], value=case_data["case_id"])
+
+@case.autocomplete("case_id")
+async def case_id_autocomplete(interaction: discord.Interaction, current: str):
+    guild_id = str(interaction.guild_id)
+    index = bot.autocomplete.get(guild_id)
+    if index is None:
+        return []
+
+    # Exakte ID per Index, dazu die letzten Cases des gewählten Users bzw. des Servers
+    user = getattr(interaction.namespace, "user", None)
+    candidates = index.user_cases.get(user.id, ()) if user else index.recent
+    choices = []
+    # Nur der direkte Zugriff per Position, kein linearer Fallback bei jedem Tastendruck
+    cases = bot.cases.get(guild_id, [])
+    case_id = int(current) if current.isdigit() else 0
+    exact = cases[case_id - 1] if 0 < case_id <= len(cases) and cases[case_id - 1]["case_id"] == case_id else None
+    if exact and (not user or exact["user_id"] == user.id):
+        choices.append(case_choice(exact))
+    for case_data in candidates:
+        if case_data is not exact and str(case_data["case_id"]).startswith(current):
+            choices.append(case_choice(case_data))
+    return choices[:25]
+
+@unwarn.autocomplete("case_id")
+async def unwarn_case_id_autocomplete(interaction: discord.Interaction, current: str):
+    user = getattr(interaction.namespace, "user", None)
+    if user is None:
+        return []
+    user_warns = bot.get_active_warns(str(interaction.guild_id), user.id)
+    return [
+        app_commands.Choice(name=f"#{w['case_id']} - {w['reason']}"[:100], value=w["case_id"])
+        for w in reversed(user_warns) if str(w["case_id"]).startswith(current)
+    ][:25]
+
+@setpermission.autocomplete("command")
+async def command_autocomplete(interaction: discord.Interaction, current: str):
+    # Binäre Suche im sortierten Index, danach nur die Treffer mit dem Prefix
+    current = current.lower()
+    start = bisect_left(bot.command_names, current)
+    choices = []
+    for name in bot.command_names[start:start + 25]:
+        if not name.startswith(current):
+            break
+        choices.append(app_commands.Choice(name=name, value=name))
+    return choices
+
+# Nicht für /report: dort würden normale Member die Gründe der Mods und fremde Reports sehen
+@ban.autocomplete("grund")
+@kick.autocomplete("grund")
+@timeout.autocomplete("grund")
+@warn.autocomplete("grund")
+@lock.autocomplete("grund")
+async def reason_autocomplete(interaction: discord.Interaction, current: str):
+    index = bot.autocomplete.get(str(interaction.guild_id))
+    if index is None:
+        return []
+    current = current.lower()
+    choices = [app_commands.Choice(name=reason, value=reason) for reason, _ in index.reasons.most_common(100) if current in reason.lower()]
+    return choices[:25]
+
 # Bot starten - ERSETZE MIT DEINEM TOKEN
 if __name__ == "__main__":
     keep_alive()
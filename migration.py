@@ -0,0 +1,11 @@
+def apply_warn_migration(cases: dict, old_warns: dict) -> list:
+    """Setzt active an den warn Cases anhand der alten warns.json, gibt die Warnungen ohne Case als (guild_id, case_id) zurück"""
+    orphans = []
+    for guild_id in cases.keys() | old_warns.keys():
+        active_ids = {w["case_id"] for user_warns in old_warns.get(guild_id, {}).values() for w in user_warns}
+        for case in cases.get(guild_id, []):
+            if case["type"] == "warn":
+                case["active"] = case["case_id"] in active_ids
+                active_ids.discard(case["case_id"])
+        orphans.extend((guild_id, case_id) for case_id in sorted(active_ids))
+    return orphans
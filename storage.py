@@ -0,0 +1,320 @@
+import asyncio
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+from tracing import tracer
+
+try:
+    import psycopg2
+    import psycopg2.extensions
+    import psycopg2.extras
+    import psycopg2.pool
+except ImportError:
+    psycopg2 = None
+
+NOTIFY_CHANNEL = "modbot"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS case_counters (
+    guild_id BIGINT PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cases (
+    guild_id BIGINT NOT NULL,
+    case_id INTEGER NOT NULL,
+    data JSONB NOT NULL,
+    PRIMARY KEY (guild_id, case_id)
+);
+CREATE TABLE IF NOT EXISTS guild_config (
+    guild_id BIGINT PRIMARY KEY,
+    data JSONB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS audit_cursors (
+    guild_id BIGINT PRIMARY KEY,
+    last_id BIGINT NOT NULL
+);
+"""
+
+# Werden pro Connection einmal vorbereitet und danach nur noch per EXECUTE genutzt
+PREPARED_STATEMENTS = {
+    "next_case_id (BIGINT)": """
+        INSERT INTO case_counters (guild_id, last_id) VALUES ($1, 1)
+        ON CONFLICT (guild_id) DO UPDATE SET last_id = case_counters.last_id + 1
+        RETURNING last_id""",
+    "insert_case (BIGINT, INTEGER, JSONB)": "INSERT INTO cases (guild_id, case_id, data) VALUES ($1, $2, $3)",
+    "get_case (BIGINT, INTEGER)": "SELECT data FROM cases WHERE guild_id = $1 AND case_id = $2",
+    "update_case (BIGINT, INTEGER, JSONB)": "UPDATE cases SET data = data || $3 WHERE guild_id = $1 AND case_id = $2",
+    "save_audit_cursor (BIGINT, BIGINT)": """
+        INSERT INTO audit_cursors (guild_id, last_id) VALUES ($1, $2)
+        ON CONFLICT (guild_id) DO UPDATE SET last_id = EXCLUDED.last_id""",
+    "get_config (BIGINT)": "SELECT data FROM guild_config WHERE guild_id = $1",
+    "save_config (BIGINT, JSONB)": """
+        INSERT INTO guild_config (guild_id, data) VALUES ($1, $2)
+        ON CONFLICT (guild_id) DO UPDATE SET data = EXCLUDED.data"""
+}
+
+if psycopg2:
+    class PreparedConnection(psycopg2.extensions.connection):
+        """Connection, die sich merkt, ob die Prepared Statements schon angelegt sind"""
+        prepared = False
+
+class PostgresStorage:
+    """Gemeinsamer Speicher für mehrere Bot-Instanzen, alle Queries laufen im Thread-Pool"""
+
+    def __init__(self, dsn: str, minconn: int = 1, maxconn: int = 5):
+        self.dsn = dsn
+        self.pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, dsn, connection_factory=PreparedConnection)
+        # Nie mehr Threads als Connections, sonst wirft der Pool PoolError
+        self.executor = ThreadPoolExecutor(max_workers=maxconn, thread_name_prefix="postgres")
+        self.instance = uuid.uuid4().hex
+        self.listener = None
+
+        # Ohne Prepared Statements, die Tabellen existieren beim ersten Start noch nicht
+        with self.cursor(prepare=False) as cur:
+            cur.execute(SCHEMA)
+            self._migrate_warns(cur)
+
+    def _migrate_warns(self, cur):
+        """Alte warns Tabelle: aktive Warnungen stehen jetzt nur noch als active=true an den warn Cases"""
+        cur.execute("SELECT to_regclass('warns') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            return
+        cur.execute("""
+            UPDATE cases c SET data = jsonb_set(c.data, '{active}', to_jsonb(EXISTS (
+                SELECT 1 FROM warns w WHERE w.guild_id = c.guild_id AND w.case_id = c.case_id
+            )))
+            WHERE c.data->>'type' = 'warn'
+        """)
+        cur.execute("DROP TABLE warns")
+
+    @contextmanager
+    def cursor(self, prepare: bool = True):
+        """Cursor aus dem Pool, eine Transaktion pro Block"""
+        conn = self.pool.getconn()
+        try:
+            if prepare and not conn.prepared:
+                with conn.cursor() as cur:
+                    for signature, sql in PREPARED_STATEMENTS.items():
+                        cur.execute(f"PREPARE {signature} AS {sql}")
+                conn.commit()
+                conn.prepared = True
+            with conn.cursor() as cur:
+                yield cur
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn, close=bool(conn.closed))
+
+    async def run(self, func, *args):
+        with tracer.span("storage.postgres", query=func.__name__.lstrip("_")):
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _notify(self, cur, kind: str, guild_id: str, **data):
+        """Informiert die anderen Instanzen, wird mit der Transaktion zusammen committed"""
+        payload = {"instance": self.instance, "kind": kind, "guild_id": guild_id, **data}
+        cur.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, json.dumps(payload)))
+
+    # ============= LADEN / IMPORT =============
+    def load(self):
+        """Lädt Cases und Config im Format der JSON Dateien"""
+        cases, config = {}, {}
+        with self.cursor() as cur:
+            cur.execute("SELECT guild_id, data FROM cases ORDER BY guild_id, case_id")
+            for guild_id, data in cur:
+                cases.setdefault(str(guild_id), []).append(data)
+            cur.execute("SELECT guild_id, data FROM guild_config")
+            for guild_id, data in cur:
+                config[str(guild_id)] = data
+        return cases, config
+
+    def is_empty(self) -> bool:
+        with self.cursor() as cur:
+            cur.execute("SELECT NOT EXISTS (SELECT 1 FROM cases) AND NOT EXISTS (SELECT 1 FROM guild_config)")
+            return cur.fetchone()[0]
+
+    def import_json(self, cases: dict, config: dict):
+        """Übernimmt bestehende JSON Daten einmalig in die Datenbank"""
+        with self.cursor() as cur:
+            for guild_id, guild_cases in cases.items():
+                for case in guild_cases:
+                    cur.execute("INSERT INTO cases (guild_id, case_id, data) VALUES (%s, %s, %s) ON CONFLICT DO NOTHING", (int(guild_id), case["case_id"], json.dumps(case)))
+                cur.execute(
+                    "INSERT INTO case_counters (guild_id, last_id) VALUES (%s, %s) ON CONFLICT (guild_id) DO UPDATE SET last_id = GREATEST(case_counters.last_id, EXCLUDED.last_id)",
+                    (int(guild_id), max((c["case_id"] for c in guild_cases), default=0))
+                )
+            for guild_id, data in config.items():
+                cur.execute("EXECUTE save_config (%s, %s)", (int(guild_id), json.dumps(data)))
+
+    # ============= CASES =============
+    def _add_case(self, guild_id: str, case: dict) -> int:
+        with self.cursor() as cur:
+            # Die Zeile in case_counters bleibt bis zum Commit gesperrt, IDs sind damit über alle Instanzen eindeutig
+            cur.execute("EXECUTE next_case_id (%s)", (int(guild_id),))
+            case_id = cur.fetchone()[0]
+            case["case_id"] = case_id
+            cur.execute("EXECUTE insert_case (%s, %s, %s)", (int(guild_id), case_id, json.dumps(case)))
+            self._notify(cur, "case", guild_id, case_id=case_id)
+        return case_id
+
+    def _add_cases(self, guild_id: str, cases: list, audit_cursor: Optional[int] = None) -> list:
+        with self.cursor() as cur:
+            if cases:
+                # Einen ganzen Block von IDs auf einmal reservieren
+                cur.execute(
+                    "INSERT INTO case_counters (guild_id, last_id) VALUES (%s, %s) ON CONFLICT (guild_id) DO UPDATE SET last_id = case_counters.last_id + EXCLUDED.last_id RETURNING last_id",
+                    (int(guild_id), len(cases))
+                )
+                first_id = cur.fetchone()[0] - len(cases) + 1
+                for offset, case in enumerate(cases):
+                    case["case_id"] = first_id + offset
+                psycopg2.extras.execute_values(
+                    cur,
+                    "INSERT INTO cases (guild_id, case_id, data) VALUES %s",
+                    [(int(guild_id), case["case_id"], json.dumps(case)) for case in cases]
+                )
+                for case in cases:
+                    self._notify(cur, "case", guild_id, case_id=case["case_id"])
+            if audit_cursor is not None:
+                # Im selben Commit wie die Cases, Einträge werden so weder doppelt noch gar nicht übernommen
+                cur.execute("EXECUTE save_audit_cursor (%s, %s)", (int(guild_id), audit_cursor))
+        return [case["case_id"] for case in cases]
+
+    def _get_case(self, guild_id: str, case_id: int) -> Optional[dict]:
+        with self.cursor() as cur:
+            cur.execute("EXECUTE get_case (%s, %s)", (int(guild_id), case_id))
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def _update_case(self, guild_id: str, case_id: int, changes: dict):
+        with self.cursor() as cur:
+            # Nur die geänderten Keys mergen, Änderungen anderer Instanzen an anderen Keys bleiben erhalten
+            cur.execute("EXECUTE update_case (%s, %s, %s)", (int(guild_id), case_id, json.dumps(changes)))
+            self._notify(cur, "case", guild_id, case_id=case_id)
+
+    async def add_case(self, guild_id: str, case: dict) -> int:
+        """Speichert einen Case und vergibt die Case ID atomar in der Datenbank"""
+        return await self.run(self._add_case, guild_id, case)
+
+    async def add_cases(self, guild_id: str, cases: list, audit_cursor: Optional[int] = None) -> list:
+        """Speichert mehrere Cases in einer Transaktion, optional zusammen mit dem Audit-Log Cursor"""
+        return await self.run(self._add_cases, guild_id, cases, audit_cursor)
+
+    async def get_case(self, guild_id: str, case_id: int) -> Optional[dict]:
+        return await self.run(self._get_case, guild_id, case_id)
+
+    async def update_case(self, guild_id: str, case: dict, fields: tuple):
+        """Schreibt nur die angegebenen Keys des Cases"""
+        await self.run(self._update_case, guild_id, case["case_id"], {field: case[field] for field in fields})
+
+    def iter_cases(self, guild_id: str, user_id: Optional[int] = None, case_type: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None):
+        """Streamt Cases über einen Server-Side Cursor, muss im Thread-Pool verbraucht werden"""
+        conditions = ["guild_id = %s"]
+        params = [int(guild_id)]
+        if user_id is not None:
+            conditions.append("(data->>'user_id')::BIGINT = %s")
+            params.append(user_id)
+        if case_type:
+            conditions.append("data->>'type' = %s")
+            params.append(case_type)
+        if start:
+            conditions.append("data->>'timestamp' >= %s")
+            params.append(start)
+        if end:
+            conditions.append("data->>'timestamp' < %s")
+            params.append(end)
+
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor(name=f"export_{uuid.uuid4().hex}") as cur:
+                cur.itersize = 1000
+                cur.execute(f"SELECT data FROM cases WHERE {' AND '.join(conditions)} ORDER BY case_id", params)
+                for (data,) in cur:
+                    yield data
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn, close=bool(conn.closed))
+
+    def _load_audit_cursors(self) -> dict:
+        with self.cursor() as cur:
+            cur.execute("SELECT guild_id, last_id FROM audit_cursors")
+            return {str(guild_id): last_id for guild_id, last_id in cur}
+
+    async def load_audit_cursors(self) -> dict:
+        return await self.run(self._load_audit_cursors)
+
+    # ============= CONFIG =============
+    def _save_config(self, guild_id: str, data: dict):
+        with self.cursor() as cur:
+            cur.execute("EXECUTE save_config (%s, %s)", (int(guild_id), json.dumps(data)))
+            self._notify(cur, "config", guild_id)
+
+    def _get_config(self, guild_id: str) -> Optional[dict]:
+        with self.cursor() as cur:
+            cur.execute("EXECUTE get_config (%s)", (int(guild_id),))
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    async def save_config(self, guild_id: str, data: dict):
+        await self.run(self._save_config, guild_id, data)
+
+    async def get_config(self, guild_id: str) -> Optional[dict]:
+        return await self.run(self._get_config, guild_id)
+
+    # ============= LISTEN / NOTIFY =============
+    async def start_listener(self, callback, reconnect: bool = False):
+        """Hört auf Änderungen anderer Instanzen, callback(payload) wird im Event Loop aufgerufen"""
+        loop = asyncio.get_running_loop()
+        try:
+            conn = await self.run(psycopg2.connect, self.dsn)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        except psycopg2.Error as e:
+            print(f"⚠️ LISTEN fehlgeschlagen, neuer Versuch in 5 Sekunden: {e}")
+            loop.call_later(5, lambda: asyncio.ensure_future(self.start_listener(callback, reconnect)))
+            return
+
+        self.listener = conn
+        loop.add_reader(conn.fileno(), self._on_notify, conn, callback)
+        if reconnect:
+            # Während der Verbindungslücke verpasste Änderungen nachladen
+            callback({"kind": "reconnect"})
+
+    def _on_notify(self, conn, callback):
+        try:
+            conn.poll()
+        except psycopg2.Error:
+            loop = asyncio.get_running_loop()
+            loop.remove_reader(conn.fileno())
+            conn.close()
+            loop.call_later(5, lambda: asyncio.ensure_future(self.start_listener(callback, True)))
+            return
+
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                payload = json.loads(notify.payload)
+            except ValueError:
+                continue
+            if payload.get("instance") != self.instance:
+                callback(payload)
+
+def create_storage() -> Optional[PostgresStorage]:
+    """PostgreSQL Backend, falls DATABASE_URL gesetzt ist, sonst None (JSON Dateien)"""
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        return None
+    if psycopg2 is None:
+        print("⚠️ DATABASE_URL gesetzt, aber psycopg2 ist nicht installiert. Nutze JSON Dateien.")
+        return None
+    return PostgresStorage(dsn, maxconn=int(os.getenv("DATABASE_POOL_SIZE", "5")))
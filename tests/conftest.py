@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Die Module liegen direkt im Repo-Root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
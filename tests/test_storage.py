@@ -0,0 +1,141 @@
+import asyncio
+import os
+import random
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL nicht gesetzt")
+psycopg2 = pytest.importorskip("psycopg2")
+
+from storage import PostgresStorage
+
+def random_guild_id() -> str:
+    # Eigene Guild pro Test, damit die Tests auch gegen eine benutzte Datenbank laufen
+    return str(random.randint(10**17, 10**18))
+
+def close(storage: PostgresStorage):
+    if storage.listener is not None and not storage.listener.closed:
+        storage.listener.close()
+    storage.executor.shutdown()
+    storage.pool.closeall()
+
+@pytest.fixture
+def storage():
+    storage = PostgresStorage(os.environ["DATABASE_URL"])
+    guild_ids = []
+    yield storage, guild_ids
+    with storage.cursor() as cur:
+        for guild_id in guild_ids:
+            for table in ("cases", "case_counters", "guild_config", "audit_cursors"):
+                cur.execute(f"DELETE FROM {table} WHERE guild_id = %s", (int(guild_id),))
+    close(storage)
+
+def make_case(case_type: str = "warn", user_id: int = 1) -> dict:
+    return {"case_id": None, "type": case_type, "user_id": user_id, "moderator_id": 2, "reason": "Test", "timestamp": "2026-01-01T00:00:00", "active": True}
+
+def test_add_case_allocates_ids_atomically(storage):
+    db, guild_ids = storage
+    guild_id = random_guild_id()
+    guild_ids.append(guild_id)
+
+    async def run():
+        return await asyncio.gather(db.add_case(guild_id, make_case()), db.add_case(guild_id, make_case()))
+
+    assert sorted(asyncio.run(run())) == [1, 2]
+    assert asyncio.run(db.add_case(guild_id, make_case())) == 3
+
+def test_update_case_round_trip(storage):
+    db, guild_ids = storage
+    guild_id = random_guild_id()
+    guild_ids.append(guild_id)
+
+    async def run():
+        case = make_case()
+        await db.add_case(guild_id, case)
+        case["active"] = False
+        case["dm_status"] = "zugestellt"
+        await db.update_case(guild_id, case, ("active", "dm_status"))
+        return case, await db.get_case(guild_id, case["case_id"])
+
+    case, stored = asyncio.run(run())
+    assert stored == case
+
+def test_update_case_merges_fields_of_other_instances(storage):
+    db, guild_ids = storage
+    guild_id = random_guild_id()
+    guild_ids.append(guild_id)
+
+    async def run():
+        case = make_case("report")
+        await db.add_case(guild_id, case)
+        # Zwei Instanzen mit eigener Kopie ändern verschiedene Keys
+        first, second = dict(case), dict(case)
+        first["triage"] = {"schwere": "hoch", "kategorie": "spam"}
+        second["report_count"] = 2
+        await db.update_case(guild_id, first, ("triage",))
+        await db.update_case(guild_id, second, ("report_count",))
+        return await db.get_case(guild_id, case["case_id"])
+
+    stored = asyncio.run(run())
+    assert stored["triage"] == {"schwere": "hoch", "kategorie": "spam"}
+    assert stored["report_count"] == 2
+
+def test_import_json(storage):
+    db, guild_ids = storage
+    guild_id = random_guild_id()
+    guild_ids.append(guild_id)
+    cases = [{**make_case(), "case_id": case_id} for case_id in (1, 2, 5)]
+    config = {"log_channel": 123}
+
+    db.import_json({guild_id: cases}, {guild_id: config})
+    loaded_cases, loaded_config = db.load()
+
+    assert loaded_cases[guild_id] == cases
+    assert loaded_config[guild_id] == config
+    # Der Zähler setzt nach der höchsten importierten ID fort
+    assert asyncio.run(db.add_case(guild_id, make_case())) == 6
+
+def test_add_cases_stores_audit_cursor(storage):
+    db, guild_ids = storage
+    guild_id = random_guild_id()
+    guild_ids.append(guild_id)
+
+    async def run():
+        await db.add_cases(guild_id, [], 100)
+        case_ids = await db.add_cases(guild_id, [make_case("ban"), make_case("kick")], 250)
+        return case_ids, await db.load_audit_cursors()
+
+    case_ids, cursors = asyncio.run(run())
+    assert case_ids == [1, 2]
+    assert cursors[guild_id] == 250
+
+def test_notify_reaches_other_instance(storage):
+    db, guild_ids = storage
+    guild_id = random_guild_id()
+    guild_ids.append(guild_id)
+    other = PostgresStorage(os.environ["DATABASE_URL"])
+
+    async def run():
+        received = []
+        arrived = asyncio.Event()
+
+        def callback(payload):
+            received.append(payload)
+            arrived.set()
+
+        await other.start_listener(callback)
+        try:
+            # Eigene Änderungen kommen nicht zurück, die der anderen Instanz schon
+            await other.add_case(guild_id, make_case())
+            case_id = await db.add_case(guild_id, make_case())
+            await asyncio.wait_for(arrived.wait(), 5)
+        finally:
+            asyncio.get_running_loop().remove_reader(other.listener.fileno())
+        return received, case_id
+
+    try:
+        received, case_id = asyncio.run(run())
+    finally:
+        close(other)
+
+    assert received == [{"instance": db.instance, "kind": "case", "guild_id": guild_id, "case_id": case_id}]
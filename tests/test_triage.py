@@ -0,0 +1,69 @@
+import asyncio
+
+from triage import StubBackend, TriageQueue
+
+class RecordingBackend(StubBackend):
+    """Stub Backend, das sich jeden Batch merkt"""
+
+    def __init__(self, delay: float = 0):
+        self.batches = []
+        self.delay = delay
+
+    async def classify(self, texts: list) -> list:
+        self.batches.append(list(texts))
+        await asyncio.sleep(self.delay)
+        return await super().classify(texts)
+
+def test_batching_and_dedupe():
+    async def run():
+        backend = RecordingBackend()
+        queue = TriageQueue(backend, batch_size=8, batch_wait=0.05)
+        queue.start()
+        futures = [queue.submit(text) for text in ("Spam im Chat", "Er droht mir", "spam  im chat")]
+        return backend, await asyncio.gather(*futures)
+
+    backend, results = asyncio.run(run())
+    assert backend.batches == [["spam im chat", "er droht mir"]]
+    assert results[0] == results[2] == {"schwere": "niedrig", "kategorie": "spam"}
+    assert results[1] == {"schwere": "hoch", "kategorie": "gewalt"}
+
+def test_cache_hit_on_normalized_text():
+    async def run():
+        backend = RecordingBackend()
+        queue = TriageQueue(backend, batch_wait=0.01)
+        queue.start()
+        first = await queue.submit("Scam Link im Chat")
+        cached = queue.submit("  scam LINK   im chat ")
+        return backend, first, cached
+
+    backend, first, cached = asyncio.run(run())
+    # Treffer aus dem Cache sind sofort fertig und gehen nicht ans Backend
+    assert cached.done()
+    assert cached.result() == first == {"schwere": "hoch", "kategorie": "scam"}
+    assert len(backend.batches) == 1
+
+def test_timeout_returns_none_and_releases_slot():
+    async def run():
+        backend = RecordingBackend(delay=1)
+        queue = TriageQueue(backend, batch_wait=0.01, concurrency=1, timeout=0.05)
+        queue.start()
+        first = await queue.submit("spam")
+        second = await queue.submit("werbung")
+        return backend, first, second
+
+    backend, first, second = asyncio.run(run())
+    assert first is None and second is None
+    # Nach dem Timeout ist der Slot wieder frei, der zweite Batch wurde gesendet
+    assert backend.batches == [["spam"], ["werbung"]]
+
+def test_queue_full_returns_none():
+    async def run():
+        queue = TriageQueue(RecordingBackend(), queue_size=1)
+        # Ohne Worker bleibt die Queue voll
+        first = queue.submit("spam")
+        second = queue.submit("nsfw")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert not first.done()
+    assert second.done() and second.result() is None
@@ -0,0 +1,23 @@
+from migration import apply_warn_migration
+
+def make_case(case_id: int, case_type: str = "warn", user_id: int = 1) -> dict:
+    return {"case_id": case_id, "type": case_type, "user_id": user_id, "moderator_id": 2, "reason": "Test", "timestamp": "2026-01-01T00:00:00"}
+
+def test_active_inactive_and_orphaned_warns():
+    cases = {"1": [make_case(1), make_case(2), make_case(3, "kick"), make_case(4, user_id=5)]}
+    # Warnung 1 und 4 sind noch aktiv, 9 hat nie einen Case bekommen
+    old_warns = {"1": {"1": [{"case_id": 1}, {"case_id": 9}], "5": [{"case_id": 4}]}}
+
+    orphans = apply_warn_migration(cases, old_warns)
+
+    assert [case.get("active") for case in cases["1"]] == [True, False, None, True]
+    assert orphans == [("1", 9)]
+
+def test_guild_without_cases_only_has_orphans():
+    cases = {"1": [make_case(1)]}
+    old_warns = {"2": {"1": [{"case_id": 3}]}}
+
+    orphans = apply_warn_migration(cases, old_warns)
+
+    assert cases["1"][0]["active"] is False
+    assert orphans == [("2", 3)]
@@ -0,0 +1,117 @@
+import asyncio
+import contextvars
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Tracing ist standardmäßig aus und kostet dann nur einen Attribut-Check pro Span
+TRACE_ENABLED = os.getenv("TRACE", "0") == "1"
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.log")
+TRACE_BUFFER_SIZE = 500
+TRACE_LAG_THRESHOLD = float(os.getenv("TRACE_LAG_THRESHOLD", "0.25"))   # Sekunden
+
+_NOOP = nullcontext()
+
+class Tracer:
+    """Zeitmessung in Spans, Ausgabe in eine rotierende Datei und einen Ring Buffer"""
+
+    def __init__(self, enabled: bool, path: str, buffer_size: int):
+        self.enabled = enabled
+        self.buffer = deque(maxlen=buffer_size)
+        self.current = contextvars.ContextVar("trace", default="-")
+        self.logger = logging.getLogger("modbot.trace")
+        self.logger.propagate = False
+        if enabled:
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+
+    def span(self, name: str, **attrs):
+        """Context Manager, misst die Dauer des Blocks (funktioniert auch um await herum)"""
+        if not self.enabled:
+            return _NOOP
+        return self._span(name, attrs)
+
+    @contextmanager
+    def _span(self, name: str, attrs: dict):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            attrs["fehler"] = type(e).__name__
+            raise
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000, **attrs)
+
+    @contextmanager
+    def trace(self, name: str):
+        """Setzt den Namen des Traces (z.B. den Command) für alle Spans darin"""
+        token = self.current.set(name)
+        try:
+            with self.span(name):
+                yield
+        finally:
+            self.current.reset(token)
+
+    def record(self, name: str, duration_ms: float, **attrs):
+        entry = (time.time(), self.current.get(), name, duration_ms, attrs)
+        self.buffer.append(entry)
+        extra = " ".join(f"{k}={v}" for k, v in attrs.items() if k != "stack")
+        self.logger.info(f"{entry[1]} {name} {duration_ms:.2f}ms {extra}".rstrip())
+        if "stack" in attrs:
+            self.logger.info(attrs["stack"])
+
+    def recent(self, count: int, name_filter: str = None) -> list:
+        entries = [e for e in self.buffer if not name_filter or name_filter in e[2] or name_filter in e[1]]
+        return entries[-count:]
+
+class LoopMonitor:
+    """Erkennt blockierende Callbacks im Event Loop und schreibt den Stack des Loop-Threads"""
+
+    def __init__(self, tracer: Tracer, threshold: float):
+        self.tracer = tracer
+        self.threshold = threshold
+        self.interval = threshold / 4
+        self.last_beat = time.monotonic()
+        self.loop_thread = None
+        self.heartbeat_task = None
+        self.reported = False
+
+    def start(self):
+        self.loop_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.heartbeat_task = asyncio.get_running_loop().create_task(self.heartbeat())
+        threading.Thread(target=self.watch, name="loop-monitor", daemon=True).start()
+
+    async def heartbeat(self):
+        while True:
+            self.last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def watch(self):
+        while True:
+            time.sleep(self.interval)
+            lag = time.monotonic() - self.last_beat - self.interval
+            if lag <= self.threshold:
+                self.reported = False
+                continue
+            # Pro Blockade nur einmal den Stack schreiben
+            if not self.reported:
+                self.reported = True
+                frame = sys._current_frames().get(self.loop_thread)
+                stack = "".join(traceback.format_stack(frame)) if frame else ""
+                self.tracer.record("loop.blockiert", lag * 1000, stack=stack)
+
+tracer = Tracer(TRACE_ENABLED, TRACE_FILE, TRACE_BUFFER_SIZE)
+
+def start_loop_monitor():
+    """Startet den Loop-Monitor, nur wenn Tracing aktiv ist"""
+    if tracer.enabled:
+        LoopMonitor(tracer, TRACE_LAG_THRESHOLD).start()
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import re
+from collections import OrderedDict
+
+# Mögliche Ergebnisse der Einstufung
+SEVERITIES = ("niedrig", "mittel", "hoch")
+CATEGORIES = ("spam", "beleidigung", "belaestigung", "nsfw", "scam", "gewalt", "sonstiges")
+
+def normalize(text: str) -> str:
+    """Normalisiert einen Text als Cache-Key"""
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+class StubBackend:
+    """Lokales, deterministisches Backend ohne Netzwerk (für Tests und Entwicklung)"""
+
+    KEYWORDS = {
+        "gewalt": (("droh", "umbring", "töten", "toeten", "kill", "gewalt"), "hoch"),
+        "scam": (("scam", "nitro", "betrug", "phishing", "steam gift"), "hoch"),
+        "nsfw": (("nsfw", "porn", "nackt", "18+"), "hoch"),
+        "belaestigung": (("belästig", "belaestig", "stalk", "verfolg", "dm spam"), "mittel"),
+        "beleidigung": (("beleidig", "idiot", "hurensohn", "bastard", "wichser"), "mittel"),
+        "spam": (("spam", "werbung", "flood", "invite"), "niedrig")
+    }
+
+    async def classify(self, texts: list) -> list:
+        results = []
+        for text in texts:
+            result = {"schwere": "niedrig", "kategorie": "sonstiges"}
+            for category, (keywords, severity) in self.KEYWORDS.items():
+                if any(keyword in text for keyword in keywords):
+                    result = {"schwere": severity, "kategorie": category}
+                    break
+            results.append(result)
+        return results
+
+class OpenAIBackend:
+    """Stuft mehrere Report-Gründe mit einer einzigen OpenAI Anfrage ein"""
+
+    def __init__(self, model: str):
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI()
+        self.model = model
+
+    async def classify(self, texts: list) -> list:
+        numbered = "\n".join(f"{i}: {text}" for i, text in enumerate(texts))
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            response_format={"type": "json_object"},
+            temperature=0,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "Du stufst Discord Reports ein. Antworte nur mit JSON der Form "
+                        '{"ergebnisse": [{"schwere": "...", "kategorie": "..."}]} in der Reihenfolge der Eingabe. '
+                        f"schwere ist eins von {', '.join(SEVERITIES)}, kategorie eins von {', '.join(CATEGORIES)}."
+                    )
+                },
+                {"role": "user", "content": numbered}
+            ]
+        )
+        data = json.loads(response.choices[0].message.content)
+        results = []
+        for i in range(len(texts)):
+            try:
+                item = data["ergebnisse"][i]
+            except (KeyError, IndexError, TypeError):
+                item = {}
+            results.append({
+                "schwere": item.get("schwere") if item.get("schwere") in SEVERITIES else "mittel",
+                "kategorie": item.get("kategorie") if item.get("kategorie") in CATEGORIES else "sonstiges"
+            })
+        return results
+
+class TriageQueue:
+    """Sammelt Anfragen zu Micro-Batches, begrenzt parallele Anfragen und cached Ergebnisse"""
+
+    def __init__(self, backend, batch_size: int = 8, batch_wait: float = 0.5, concurrency: int = 2, timeout: float = 20, cache_size: int = 2000, queue_size: int = 500):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.worker = None
+        self.tasks = set()
+
+    def start(self):
+        if self.worker is None:
+            self.worker = asyncio.create_task(self._run())
+
+    def submit(self, text: str):
+        """Gibt ein Future mit dem Ergebnis (oder None) zurück, blockiert nie"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = normalize(text)
+
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            future.set_result(self.cache[key])
+            return future
+
+        try:
+            self.queue.put_nowait((key, future))
+        except asyncio.QueueFull:
+            future.set_result(None)
+        return future
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self.semaphore.acquire()
+            # Laufende Anfragen festhalten, sonst kann der GC sie mittendrin einsammeln
+            task = asyncio.create_task(self._classify(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _classify(self, batch: list):
+        # Gleiche Texte im Batch nur einmal anfragen
+        waiting = {}
+        for key, future in batch:
+            waiting.setdefault(key, []).append(future)
+        texts = list(waiting)
+
+        try:
+            results = await asyncio.wait_for(self.backend.classify(texts), self.timeout)
+        except Exception as e:
+            print(f"⚠️ Triage fehlgeschlagen: {e}")
+            results = None
+        finally:
+            self.semaphore.release()
+
+        if results is None or len(results) != len(texts):
+            results = [None] * len(texts)
+
+        for key, result in zip(texts, results):
+            if result is not None:
+                self.cache[key] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            for future in waiting[key]:
+                if not future.done():
+                    future.set_result(result)
+
+def create_triage_queue():
+    """Erstellt die Triage-Queue je nach Umgebung (TRIAGE_BACKEND=openai|stub), sonst None"""
+    backend = os.getenv("TRIAGE_BACKEND") or ("openai" if os.getenv("OPENAI_API_KEY") else None)
+    if backend == "stub":
+        return TriageQueue(StubBackend())
+    if backend == "openai":
+        try:
+            return TriageQueue(OpenAIBackend(os.getenv("TRIAGE_MODEL", "gpt-4o-mini")))
+        except ImportError:
+            print("⚠️ openai ist nicht installiert, Triage deaktiviert")
+    return None